@@ -0,0 +1,730 @@
+"""
+RobotGUI
+Micro-benchmarks
+
+Run: python benchmark.py <benchmark> [options]
+"""
+
+import argparse
+import glob
+import os
+import random
+import re
+import threading
+import time
+
+import stringcase
+
+import bindings
+
+
+class _Sink:
+    """ Stand-in for any widget, every attribute is a no-op setter """
+    def __getattr__(self, item):
+        return self._set
+
+    def _set(self, *_):
+        pass
+
+
+class _SinkWindow:
+    def __getattr__(self, item):
+        sink = _Sink()
+        setattr(self, item, sink)
+        return sink
+
+
+def _post(func, *args):
+    func(*args)
+
+
+window = None
+
+
+def _legacy_value_changed(_, key, value, is_new):
+    """ SmartDashboard dispatch as it was before the binding registry """
+    if "window" in globals().keys():
+        if key == 'Mode':
+            _post(window.arm_mode.setText, str(value).replace("_", " ").title())
+            if str(value) == "Scoring":
+                _post(window.arm_mode_color.setColor, "#4caf50")
+            elif str(value) == "Picking_up":
+                _post(window.arm_mode_color.setColor, "#00bcd4")
+            else:
+                _post(window.arm_mode_color.setColor, "#fafafa")
+        elif key == 'Object':
+            _post(window.arm_obj.setText, str(value).replace('Neither', 'None').replace("_", " ").title())
+            if str(value) == "Cube":
+                _post(window.arm_obj_mode_color.setColor, "#9c27b0")
+            elif str(value) == "Cone":
+                _post(window.arm_obj_mode_color.setColor, "#fdd835")
+            else:
+                _post(window.arm_obj_mode_color.setColor, "#fafafa")
+        elif key == 'ScorePos':
+            _post(window.s_p.setText, stringcase.titlecase(str(value).replace('Neither', 'None')))
+        elif key == 'PickPos':
+            _post(window.s_p.setText, stringcase.titlecase(str(value).replace('Neither', 'None')))
+        elif re.match(r"Mod \d Cancoder", key):
+            _post(getattr(window, f"swerve_mod_{int(str(key)[4])}").setCancoderValue, value)
+        elif re.match(r"Mod \d Integrated", key):
+            _post(getattr(window, f"swerve_mod_{int(str(key)[4])}").setIntegratedValue, value)
+        elif re.match(r"Mod \d Velocity", key):
+            _post(getattr(window, f"swerve_mod_{int(str(key)[4])}").setVelocityValue, value)
+
+
+def synthetic_updates(count: int, extra_keys: int = 0, seed: int = 6369) -> list:
+    """ A reproducible mix of the SmartDashboard keys RobotGUI uses """
+    rng = random.Random(seed)
+    keys = [f"Mod {module} {kind}" for module in range(4) for kind in ("Cancoder", "Integrated", "Velocity")]
+    keys += [f"Unrelated {i}" for i in range(extra_keys)]
+    enums = {
+        "Mode": ("Scoring", "Picking_up", "Idle"),
+        "Object": ("Cube", "Cone", "Neither"),
+        "ScorePos": ("high", "mid", "low", "Neither"),
+        "PickPos": ("ground", "double_substation", "Neither"),
+    }
+
+    updates = []
+    for _ in range(count):
+        if rng.random() < 0.1:
+            key = rng.choice(tuple(enums))
+            updates.append((key, rng.choice(enums[key])))
+        else:
+            updates.append((rng.choice(keys), round(rng.uniform(-180, 180), 3)))
+    return updates
+
+
+def bench_dispatch(options) -> None:
+    """ Legacy if/elif + regex dispatch vs BindingRegistry """
+    global window
+    window = _SinkWindow()
+    updates = synthetic_updates(options.updates, options.extra_keys)
+
+    start = time.perf_counter()
+    for key, value in updates:
+        _legacy_value_changed(None, key, value, False)
+    legacy = time.perf_counter() - start
+
+    registry = bindings.create_bindings(window, _post)
+    start = time.perf_counter()
+    for key, value in updates:
+        registry.dispatch(key, value)
+    registry_time = time.perf_counter() - start
+
+    print(f"{len(updates)} updates, {options.extra_keys} unrelated keys")
+    print(f"legacy:   {legacy * 1e3:8.2f} ms  {len(updates) / legacy:12.0f} updates/s")
+    print(f"registry: {registry_time * 1e3:8.2f} ms  {len(updates) / registry_time:12.0f} updates/s")
+    print(f"speedup:  {legacy / registry_time:8.2f}x")
+
+
+def _qt_app():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
+
+
+def bench_flood(options) -> None:
+    """ Flood the FrameScheduler from a listener-like thread and count what reaches the GUI """
+    from PyQt6.QtCore import QTimer
+
+    import scheduler
+
+    app = _qt_app()
+    frames = scheduler.FrameScheduler(options.frame_rate)
+    registry = bindings.create_bindings(_SinkWindow(), frames.post)
+    updates = synthetic_updates(options.updates, options.extra_keys)
+    done = threading.Event()
+
+    def publisher():
+        period = 1 / options.rate
+        deadline = time.perf_counter()
+        for key, value in updates:
+            registry.dispatch(key, value)
+            deadline += period
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        done.set()
+
+    def check_done():
+        if done.is_set():
+            app.quit()
+
+    poll = QTimer()
+    poll.timeout.connect(check_done)
+    poll.start(50)
+
+    thread = threading.Thread(target=publisher, daemon=True)
+    gui_cpu = time.thread_time()
+    start = time.perf_counter()
+    thread.start()
+    app.exec()
+    frames.flush()
+    elapsed = time.perf_counter() - start
+    gui_cpu = time.thread_time() - gui_cpu
+
+    stats = frames.stats()
+    print(f"{len(updates)} updates at {options.rate} Hz over {elapsed:.2f} s, {frames.rate:.0f} fps")
+    print(f"received:  {stats['received']}")
+    print(f"applied:   {stats['applied']}")
+    print(f"coalesced: {stats['coalesced']} ({stats['coalesced'] / max(1, stats['received']):.1%})")
+    print(f"GUI thread CPU: {gui_cpu * 1e3:.1f} ms ({gui_cpu / elapsed:.1%})")
+
+
+def _multipart(frames: list, content_length: bool = True) -> bytes:
+    parts = []
+    for frame in frames:
+        header = b"--frame\r\nContent-Type: image/jpeg\r\n"
+        if content_length:
+            header += b"Content-Length: %d\r\n" % len(frame)
+        parts.append(header + b"\r\n" + frame + b"\r\n")
+    return b"".join(parts)
+
+
+def _concat_parse(stream: bytes, chunk: int) -> int:
+    """ Naive bytes concatenation parser for comparison """
+    data = b""
+    frames = 0
+    for offset in range(0, len(stream), chunk):
+        data += stream[offset:offset + chunk]
+        while True:
+            soi = data.find(b"\xff\xd8")
+            eoi = data.find(b"\xff\xd9", soi + 2) if soi >= 0 else -1
+            if eoi < 0:
+                break
+            _frame = data[soi:eoi + 2]
+            data = data[eoi + 2:]
+            frames += 1
+    return frames
+
+
+def bench_mjpeg(options) -> None:
+    """ MJPEGParser throughput in memory and against the local stand-in server """
+    import resource
+    import urllib.request
+
+    import mjpeg
+    import mjpeg_server
+
+    width, height = (int(v) for v in options.size.lower().split("x"))
+    frames = mjpeg_server.synthetic_frames(width, height)
+    average = sum(map(len, frames)) / len(frames)
+    print(f"{len(frames)} synthetic {options.size} frames, avg {average / 1024:.0f} KiB")
+
+    for content_length in (True, False):
+        stream = _multipart(frames, content_length) * 10
+        parser = mjpeg.MJPEGParser()
+        start = time.perf_counter()
+        for offset in range(0, len(stream), 65536):
+            parser.feed(stream[offset:offset + 65536])
+            while parser.next_frame() is not None:
+                pass
+        elapsed = time.perf_counter() - start
+        label = "Content-Length" if content_length else "SOI/EOI scan "
+        print(f"parser  ({label}): {len(stream) / elapsed / 1e6:8.0f} MB/s {parser.frames / elapsed:8.0f} fps")
+
+    stream = _multipart(frames, False) * 2
+    start = time.perf_counter()
+    count = _concat_parse(stream, 65536)
+    elapsed = time.perf_counter() - start
+    print(f"bytes concatenation (SOI/EOI): {len(stream) / elapsed / 1e6:8.0f} MB/s {count / elapsed:8.0f} fps")
+
+    server = mjpeg_server.MJPEGServer(frames, fps=0)
+    server.start()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    parser = mjpeg.MJPEGParser()
+    with urllib.request.urlopen(server.url, timeout=5) as response:
+        readinto = response.fp.readinto1
+        start = time.perf_counter()
+        while time.perf_counter() - start < options.duration:
+            parser.commit(readinto(parser.writable()))
+            while parser.next_frame() is not None:
+                pass
+        elapsed = time.perf_counter() - start
+    server.shutdown()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss
+    print(f"local HTTP stand-in: {parser.bytes_received / elapsed / 1e6:8.0f} MB/s "
+          f"{parser.frames / elapsed:8.0f} fps over {elapsed:.1f} s, peak RSS growth {rss / 1024:.1f} MiB")
+
+
+def bench_recorder(options) -> None:
+    """ TelemetryRecorder cost per update and file size vs JSON lines """
+    import json
+    import tempfile
+
+    import telemetry
+
+    updates = [(f"SmartDashboard/{key}", value) for key, value in synthetic_updates(options.updates,
+                                                                                    options.extra_keys)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        recorder = telemetry.TelemetryRecorder(os.path.join(directory, "bench.rgtl"))
+        start = time.perf_counter()
+        for key, value in updates:
+            recorder.record(key, value)
+        elapsed = time.perf_counter() - start
+        recorder.close()
+        size = os.path.getsize(recorder.path)
+
+        now = time.time()
+        json_path = os.path.join(directory, "bench.jsonl")
+        start = time.perf_counter()
+        with open(json_path, "w", encoding="UTF-8") as file:
+            for key, value in updates:
+                file.write(json.dumps({"t": now, "key": key, "value": value}) + "\n")
+        json_elapsed = time.perf_counter() - start
+        json_size = os.path.getsize(json_path)
+
+    print(f"{len(updates)} updates")
+    print(f"binary:     {elapsed / len(updates) * 1e6:6.2f} us/update {size / 1024:10.0f} KiB")
+    print(f"JSON lines: {json_elapsed / len(updates) * 1e6:6.2f} us/update {json_size / 1024:10.0f} KiB "
+          f"({json_size / size:.1f}x larger)")
+
+
+def _record_stream(url: str, duration: float, recorder) -> tuple:
+    """ Parse the stream at url for duration seconds, handing every frame to recorder if given """
+    import urllib.request
+
+    import mjpeg
+
+    parser = mjpeg.MJPEGParser()
+    append_times = []
+    cpu = time.process_time()
+    with urllib.request.urlopen(url, timeout=5) as response:
+        readinto = response.fp.readinto1
+        start = time.perf_counter()
+        while (now := time.perf_counter()) - start < duration:
+            parser.commit(readinto(parser.writable()))
+            while (frame := parser.next_frame()) is not None:
+                if recorder is not None:
+                    appended = time.perf_counter()
+                    recorder.append(frame, now)
+                    append_times.append(time.perf_counter() - appended)
+        elapsed = time.perf_counter() - start
+    if recorder is not None:
+        recorder.close()
+    return parser, elapsed, time.process_time() - cpu, sorted(append_times)
+
+
+def bench_camrecord(options) -> None:
+    """ SegmentRecorder write throughput, and its CPU cost at camera frame rate, against the local stand-in """
+    import tempfile
+
+    import clips
+    import mjpeg_server
+
+    width, height = (int(v) for v in options.size.lower().split("x"))
+    frames = mjpeg_server.synthetic_frames(width, height)
+    print(f"{len(frames)} synthetic {options.size} frames, avg {sum(map(len, frames)) / len(frames) / 1024:.0f} KiB")
+
+    with tempfile.TemporaryDirectory() as directory:
+        server = mjpeg_server.MJPEGServer(frames, fps=0)
+        server.start()
+        recorder = clips.SegmentRecorder(directory, options.segment_mb * 2 ** 20, 4 * options.segment_mb * 2 ** 20)
+        parser, elapsed, _, append_times = _record_stream(server.url, options.duration, recorder)
+        server.shutdown()
+        print(f"unthrottled: {recorder.bytes_written / elapsed / 1e6:6.0f} MB/s {recorder.frames / elapsed:6.0f} fps "
+              f"written, {recorder.dropped} of {parser.frames} frames dropped, {recorder.segments} segments, "
+              f"{len(glob.glob(os.path.join(directory, '*.mjpeg')))} kept")
+        print(f"append on the reader thread: p50 {_percentile(append_times, 0.5) * 1e6:.0f} us, "
+              f"p99 {_percentile(append_times, 0.99) * 1e6:.0f} us")
+
+        server = mjpeg_server.MJPEGServer(frames, fps=options.camera_fps)
+        server.start()
+        costs = {}
+        for label in ("not recording", "recording"):
+            recorder = clips.SegmentRecorder(directory) if label == "recording" else None
+            _, elapsed, cpu, _ = _record_stream(server.url, options.duration, recorder)
+            costs[label] = cpu / elapsed
+            print(f"{options.camera_fps:.0f} fps, {label}: process CPU {cpu / elapsed:.1%}")
+        server.shutdown()
+        print(f"recording cost: {costs['recording'] - costs['not recording']:.1%} of a core")
+
+
+def bench_camgrid(options) -> None:
+    """ Decoded frame rate per stream with several streams sharing a camera.DecodePool """
+    import camera
+    import mjpeg_server
+
+    app = _qt_app()
+    width, height = (int(v) for v in options.size.lower().split("x"))
+    frames = mjpeg_server.synthetic_frames(width, height)
+
+    servers = [mjpeg_server.MJPEGServer(frames, fps=options.camera_fps) for _ in range(options.streams)]
+    for server in servers:
+        server.start()
+
+    pool = camera.DecodePool(options.workers)
+    readers = [camera.MJPEGReader(server.url, pool) for server in servers]
+    for number, reader in enumerate(readers):
+        pool.add(reader)
+        pool.set_priority(reader, 0 if number == 0 else 1, 1 / options.secondary_fps if number else 0.0)
+        reader.frame_ready.connect(reader.take_frame)
+        reader.start()
+
+    deadline = time.perf_counter() + options.duration
+    cpu = time.process_time()
+    while time.perf_counter() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+    cpu = time.process_time() - cpu
+
+    for reader in readers:
+        reader.stop()
+    camera.wait_stopped()
+    pool.stop()
+    for server in servers:
+        server.shutdown()
+
+    print(f"{options.streams} x {options.size} at {options.camera_fps:.0f} fps, {options.workers} decode workers, "
+          f"secondary streams capped at {options.secondary_fps:.0f} fps")
+    for number, reader in enumerate(readers):
+        print(f"{'main' if number == 0 else 'secondary'} {number}: {reader.frames_received / options.duration:5.1f} "
+              f"fps decoded, {reader.decode_skipped} skipped")
+    print(f"process CPU: {cpu / options.duration:.0%}")
+
+
+def bench_camscale(options) -> None:
+    """ Decode (worker) and paint (GUI thread) cost: scaling when painting vs decoding at the display size """
+    from PyQt6.QtCore import QPointF, QRectF, Qt
+    from PyQt6.QtGui import QImage, QPainter
+
+    import camera
+    import mjpeg_server
+
+    _app = _qt_app()
+    width, height = (int(v) for v in options.size.lower().split("x"))
+    display_width, display_height = (int(v) for v in options.display.lower().split("x"))
+    frames = mjpeg_server.synthetic_frames(width, height, 10) * 3
+    canvas = QImage(display_width, display_height, QImage.Format.Format_RGB32)
+
+    def paint(image: QImage, scale: bool) -> None:
+        painter = QPainter(canvas)
+        if scale:
+            size = image.size().scaled(canvas.size(), Qt.AspectRatioMode.KeepAspectRatio)
+            painter.drawImage(QRectF((display_width - size.width()) / 2, (display_height - size.height()) / 2,
+                                     size.width(), size.height()), image)
+        else:
+            painter.drawImage(QPointF((display_width - image.width()) / 2, (display_height - image.height()) / 2),
+                              image)
+        painter.end()
+
+    print(f"{options.size} frames shown in {options.display}")
+    for label, decode, scale in (
+            ("full size, scaled when painted", lambda jpeg: QImage.fromData(jpeg, "JPG"), True),
+            ("decoded at display size       ", lambda jpeg: camera.decode_scaled(jpeg, display_width,
+                                                                                 display_height), False)):
+        decode_time = paint_time = 0.0
+        for jpeg in frames:
+            start = time.perf_counter()
+            image = decode(jpeg)
+            decoded = time.perf_counter()
+            paint(image, scale)
+            paint_time += time.perf_counter() - decoded
+            decode_time += decoded - start
+        print(f"{label}: decode {decode_time / len(frames) * 1e3:5.1f} ms (worker), "
+              f"paint {paint_time / len(frames) * 1e3:5.2f} ms (GUI thread), "
+              f"image {image.width()}x{image.height()}")
+
+
+def _free_port() -> int:
+    import socket
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    if not ordered:
+        return float("nan")
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class _LatencyProbe:
+    """ Wraps widget setters to note when each published sequence number reaches the widget """
+    def __init__(self) -> None:
+        self.published = {}
+        self.latencies = []
+        self.applied = 0
+
+    def wrap(self, setter):
+        def probe(value, *args):
+            now = time.perf_counter()
+            sequence = int(float(str(value).split()[-1]))
+            published = self.published.pop(sequence, None)
+            if published is not None:
+                self.latencies.append(now - published)
+                self.applied += 1
+            return setter(value, *args)
+        return probe
+
+
+def bench_colorblock(options) -> None:
+    """ Stylesheet ColorBlock (before) vs painted ColorBlock, under the qt-material theme """
+    from PyQt6.QtWidgets import QFrame
+
+    import qt_material
+
+    import widgets
+
+    class StylesheetColorBlock(QFrame):
+        def __init__(self) -> None:
+            super(StylesheetColorBlock, self).__init__()
+            self.setFrameShape(QFrame.Shape.Box)
+            self.setFixedSize(240, 240)
+
+        def setRGB(self, red, green, blue):
+            self.setStyleSheet(f"background-color: #{widgets.rgb_to_hex((int(red), int(green), int(blue)))};")
+
+    app = _qt_app()
+    qt_material.apply_stylesheet(app, theme="dark_red.xml",
+                                 css_file=os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                                       "material-fixes.qss"))
+    rng = random.Random(6369)
+    samples = [(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(options.updates)]
+    # a sensor sitting still repeats the same color
+    samples[len(samples) // 2:] = [samples[0]] * (len(samples) - len(samples) // 2)
+
+    painted = widgets.ColorBlock()
+    painted.setFixedSize(240, 240)
+    for label, block in (("stylesheet", StylesheetColorBlock()), ("painted", painted)):
+        block.show()
+        app.processEvents()
+        start = time.perf_counter()
+        for i, sample in enumerate(samples):
+            block.setRGB(*sample)
+            if i % 4 == 0:  # ~4 samples per UI frame
+                app.processEvents()
+        app.processEvents()
+        elapsed = time.perf_counter() - start
+        print(f"{label:>10}: {len(samples) / elapsed:10.0f} updates/s")
+        block.hide()
+
+
+def bench_e2e(options) -> None:
+    """ NetworkTables value change -> widget update latency of the real MainWindow, headless """
+    import json
+    import tempfile
+
+    from PyQt6.QtCore import QEventLoop, QTimer
+    from networktables import NetworkTables, NetworkTablesInstance
+
+    import main
+    import scheduler
+
+    directory = tempfile.mkdtemp()
+    main.args = main.parser.parse_args(["-s", os.path.join(directory, "settings.json")])
+    main.settings = {**main.DEFAULT_SETTINGS, "first_run": False, "show_updates": False,
+                     "record_telemetry": False, "ui_frame_rate": options.frame_rate}
+    main.app = app = _qt_app()
+    main.ui_scheduler = scheduler.FrameScheduler(options.frame_rate)
+    main.window = window = main.MainWindow()
+
+    probe = _LatencyProbe()
+    window.arm_mode.setText = probe.wrap(window.arm_mode.setText)
+    for module in range(4):
+        swerve = getattr(window, f"swerve_mod_{module}")
+        swerve.setCancoderValue = probe.wrap(swerve.setCancoderValue)
+        swerve.setVelocityValue = probe.wrap(swerve.setVelocityValue)
+    window.color_red.setText = probe.wrap(window.color_red.setText)
+    # measured on the swerve tab, it has most of the keys, the others are held back by the page gate
+    window.tab_widget.setCurrentWidget(window.swerve_tab_widget)
+    window.show()
+    main.start_bindings()
+
+    port = _free_port()
+    server = NetworkTablesInstance.create()
+    server.startServer(os.path.join(directory, "networktables.ini"), "127.0.0.1", port)
+    server.setUpdateRate(0.01)
+    main.start_networktables(("127.0.0.1", port))
+    NetworkTables.setUpdateRate(0.01)
+
+    def wait(seconds: float) -> None:
+        loop = QEventLoop()
+        QTimer.singleShot(int(seconds * 1000), loop.quit)
+        loop.exec()
+
+    deadline = time.perf_counter() + 5
+    while not NetworkTables.isConnected() and time.perf_counter() < deadline:
+        wait(0.05)
+
+    sd = server.getTable(main.SD_TABLE)
+    color = server.getTable(main.COLOR_TABLE)
+    setters = [lambda seq: sd.putString("Mode", f"Bench_{seq}")]
+    for module in range(4):
+        setters.append(lambda seq, m=module: sd.putNumber(f"Mod {m} Cancoder", seq))
+        setters.append(lambda seq, m=module: sd.putNumber(f"Mod {m} Velocity", seq))
+    setters.append(lambda seq: color.putNumber("colorSensorRed", seq))
+    hidden = {window.object_tab_widget: [setters[0]], window.color_tab_widget: [setters[-1]]}
+    held_back = {setter for page_setters in hidden.values() for setter in page_setters}
+
+    results = []
+    sequence = 0
+    for rate in (float(r) for r in options.rates.split(",")):
+        probe.latencies.clear()
+        probe.applied = 0
+        received = main.ui_scheduler.received
+        published = held = 0
+        last = {}  # setter -> its last sequence number
+        cpu = time.process_time()
+        period = 1 / rate
+        start = next_publish = time.perf_counter()
+
+        while time.perf_counter() - start < options.duration:
+            now = time.perf_counter()
+            while next_publish <= now:
+                sequence += 1
+                setter = setters[sequence % len(setters)]
+                if setter in held_back:
+                    held += 1
+                else:
+                    probe.published[sequence] = time.perf_counter()
+                    last[setter] = sequence
+                    published += 1
+                setter(sequence)
+                next_publish += period
+            server.flush()
+            app.processEvents()
+            time.sleep(0.0005)
+        wait(0.5)  # drain
+
+        cpu = time.process_time() - cpu
+        # the scheduler only applies the latest value of a setter per frame, a value is lost only if it was the last
+        dropped = sum(1 for sequence in last.values() if sequence in probe.published)
+        probe.published.clear()
+        latencies = sorted(probe.latencies)
+        results.append({
+            "rate_hz": rate,
+            "published": published,
+            "held": held,
+            "received": main.ui_scheduler.received - received,
+            "applied": probe.applied,
+            "coalesced": published - probe.applied - dropped,
+            "dropped": dropped,
+            "p50_ms": _percentile(latencies, 0.50) * 1e3,
+            "p95_ms": _percentile(latencies, 0.95) * 1e3,
+            "p99_ms": _percentile(latencies, 0.99) * 1e3,
+            "cpu_s": cpu,
+            "cpu_percent": cpu / (options.duration + 0.5) * 100,
+        })
+
+    # values for hidden tabs must be held while hidden and applied as soon as the tab is shown
+    shown = []
+    for page, page_setters in hidden.items():
+        probe.latencies.clear()
+        probe.applied = 0
+        for setter in page_setters:
+            sequence += 1
+            probe.published[sequence] = time.perf_counter()
+            setter(sequence)
+        server.flush()
+        wait(0.3)
+        held = probe.applied == 0
+        start = time.perf_counter()
+        window.tab_widget.setCurrentWidget(page)
+        while probe.applied < len(page_setters) and time.perf_counter() - start < 1.0:
+            app.processEvents()
+            time.sleep(0.0005)
+        shown.append({"tab": window.tab_widget.tabText(window.tab_widget.indexOf(page)), "held": held,
+                      "applied": probe.applied == len(page_setters),
+                      "show_to_applied_ms": (time.perf_counter() - start) * 1e3})
+    probe.published.clear()
+
+    NetworkTables.shutdown()
+    server.shutdown()
+
+    report = {"benchmark": "e2e", "frame_rate": options.frame_rate, "duration_s": options.duration,
+              "results": results, "hidden_tabs": shown}
+    if options.report:
+        with open(options.report, "w", encoding="UTF-8") as file:
+            json.dump(report, file, indent=2)
+
+    print(f"{'rate Hz':>8} {'published':>9} {'held':>6} {'applied':>8} {'coalesced':>9} {'dropped':>8} "
+          f"{'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'CPU %':>6}")
+    for result in results:
+        print(f"{result['rate_hz']:8.0f} {result['published']:9d} {result['held']:6d} {result['applied']:8d} "
+              f"{result['coalesced']:9d} {result['dropped']:8d} {result['p50_ms']:7.1f} {result['p95_ms']:7.1f} {result['p99_ms']:7.1f} "
+              f"{result['cpu_percent']:6.1f}")
+    for tab in shown:
+        print(f"hidden {tab['tab']} tab: {'held' if tab['held'] else 'NOT HELD'} while hidden, "
+              f"{'applied' if tab['applied'] else 'NOT APPLIED'} {tab['show_to_applied_ms']:.1f} ms after showing it")
+
+
+def bench_reconnect(options) -> None:
+    """ Time from changing the robot address to the first value from the new server """
+    import tempfile
+
+    from networktables import NetworkTables, NetworkTablesInstance
+
+    import main
+
+    directory = tempfile.mkdtemp()
+    servers = []
+    for index in range(2):
+        port = _free_port()
+        server = NetworkTablesInstance.create()
+        server.startServer(os.path.join(directory, f"networktables-{index}.ini"), "127.0.0.1", port)
+        server.getTable(main.SD_TABLE).putString("Mode", f"Server {index}")
+        servers.append((server, ("127.0.0.1", port)))
+
+    main.start_networktables(servers[0][1])
+    deadline = time.perf_counter() + 5
+    while main.health.snapshot(time.perf_counter()).age is None and time.perf_counter() < deadline:
+        time.sleep(0.001)
+
+    times = []
+    for attempt in range(options.reconnects):
+        main.reconnect_networktables(servers[(attempt + 1) % 2][1])
+        deadline = time.perf_counter() + 5
+        while main.health.time_to_data is None and time.perf_counter() < deadline:
+            time.sleep(0.001)
+        times.append(main.health.time_to_data)
+
+    NetworkTables.shutdown()
+    for server, _ in servers:
+        server.shutdown()
+
+    reached = sorted(t for t in times if t is not None)
+    print(f"{len(reached)}/{len(times)} reconnects got data within 5 s")
+    if reached:
+        print(f"edit -> first value: p50 {_percentile(reached, 0.5) * 1e3:.0f} ms, "
+              f"max {reached[-1] * 1e3:.0f} ms")
+
+
+BENCHMARKS = {
+    "dispatch": bench_dispatch,
+    "flood": bench_flood,
+    "mjpeg": bench_mjpeg,
+    "recorder": bench_recorder,
+    "colorblock": bench_colorblock,
+    "e2e": bench_e2e,
+    "reconnect": bench_reconnect,
+    "camrecord": bench_camrecord,
+    "camgrid": bench_camgrid,
+    "camscale": bench_camscale,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("benchmark", choices=BENCHMARKS)
+    parser.add_argument("-n", "--updates", type=int, default=100_000, help="number of synthetic updates")
+    parser.add_argument("--extra-keys", type=int, default=0, help="unrelated SmartDashboard keys to mix in")
+    parser.add_argument("--rate", type=float, default=2000, help="publish rate in updates per second")
+    parser.add_argument("--frame-rate", type=int, default=60, help="UI frames per second")
+    parser.add_argument("--size", default="1920x1080", help="camera frame size, WIDTHxHEIGHT")
+    parser.add_argument("--duration", type=float, default=5, help="seconds to run streaming benchmarks")
+    parser.add_argument("--rates", default="50,200,1000", help="e2e: comma separated publish rates in Hz")
+    parser.add_argument("--reconnects", type=int, default=10, help="reconnect: address changes to time")
+    parser.add_argument("--segment-mb", type=int, default=64, help="camrecord: segment size in MiB")
+    parser.add_argument("--camera-fps", type=float, default=30, help="camrecord: frame rate for the CPU cost run")
+    parser.add_argument("--streams", type=int, default=3, help="camgrid: number of camera streams")
+    parser.add_argument("--workers", type=int, default=2, help="camgrid: decode worker threads")
+    parser.add_argument("--secondary-fps", type=float, default=10, help="camgrid: decode rate cap of the others")
+    parser.add_argument("--display", default="1280x720", help="camscale: view size, WIDTHxHEIGHT")
+    parser.add_argument("--report", help="write a JSON report to this file")
+    options = parser.parse_args()
+
+    BENCHMARKS[options.benchmark](options)
@@ -0,0 +1,145 @@
+"""
+RobotGUI
+NetworkTables key to widget bindings
+"""
+
+import functools
+import re
+
+from typing import Any, Callable, NamedTuple, Optional
+
+import stringcase
+
+
+@functools.lru_cache(maxsize=256)
+def mode_text(value: str) -> str:
+    """ 'Picking_up' -> 'Picking Up' """
+    return value.replace("_", " ").title()
+
+
+@functools.lru_cache(maxsize=256)
+def object_text(value: str) -> str:
+    """ 'Neither' -> 'None', 'Some_thing' -> 'Some Thing' """
+    return value.replace("Neither", "None").replace("_", " ").title()
+
+
+@functools.lru_cache(maxsize=256)
+def position_text(value: str) -> str:
+    """ 'Neither' -> 'None', 'high_cone' -> 'High Cone' """
+    return stringcase.titlecase(value.replace("Neither", "None"))
+
+
+class Binding(NamedTuple):
+    """
+    Precomputed handler for a single NetworkTables key
+
+    setter receives transform(str(value)) if a transform is given, else the raw value.
+    color_setter receives colors.get(str(value), default_color).
+    sample receives every raw value right away on the listener thread (for plots).
+    post replaces the registry's post for this binding, see scheduler.PageGate.poster.
+    """
+    setter: Callable[[Any], None]
+    transform: Optional[Callable[[str], Any]] = None
+    color_setter: Optional[Callable[[str], None]] = None
+    colors: Optional[dict] = None
+    default_color: str = "#fafafa"
+    sample: Optional[Callable[[Any], None]] = None
+    post: Optional[Callable[..., None]] = None
+
+
+class BindingRegistry:
+    """
+    Maps NetworkTables keys to bindings
+
+    Patterns are only evaluated the first time a key is seen, the result
+    (including "no binding") is cached so dispatch is a single dict lookup.
+    """
+    def __init__(self, post: Callable[..., None]) -> None:
+        self.post = post
+
+        self._bindings: dict[str, Optional[Binding]] = {}
+        self._patterns: list[tuple[re.Pattern, Callable[[re.Match], Optional[Binding]]]] = []
+
+    def bind(self, key: str, binding: Binding) -> None:
+        self._bindings[key] = binding
+
+    def bind_pattern(self, pattern: str, factory: Callable[[re.Match], Optional[Binding]]) -> None:
+        """
+        Bind every key fully matching pattern, factory builds the binding from the match
+        """
+        self._patterns.append((re.compile(pattern), factory))
+        # forget cached misses, they may match now
+        self._bindings = {key: binding for key, binding in self._bindings.items() if binding is not None}
+
+    def resolve(self, key: str) -> Optional[Binding]:
+        try:
+            return self._bindings[key]
+        except KeyError:
+            pass
+
+        binding = None
+        for pattern, factory in self._patterns:
+            match = pattern.fullmatch(key)
+            if match:
+                binding = factory(match)
+                break
+
+        self._bindings[key] = binding
+        return binding
+
+    def dispatch(self, key: str, value: Any) -> bool:
+        """
+        Post the widget updates for key, returns False if the key is not bound
+        """
+        binding = self._bindings.get(key, False)
+        if binding is False:
+            binding = self.resolve(key)
+        if binding is None:
+            return False
+
+        if binding.sample is not None:
+            binding.sample(value)
+
+        post = binding.post or self.post
+        if binding.transform is None and binding.color_setter is None:
+            post(binding.setter, value)
+            return True
+
+        text = str(value)
+        post(binding.setter, value if binding.transform is None else binding.transform(text))
+        if binding.color_setter is not None:
+            post(binding.color_setter, binding.colors.get(text, binding.default_color))
+
+        return True
+
+
+def create_bindings(main_window, post: Callable[..., None], gate=None) -> BindingRegistry:
+    """
+    SmartDashboard key -> MainWindow widget bindings
+
+    With a scheduler.PageGate, updates for widgets on hidden tabs are held back by the gate.
+    """
+    registry = BindingRegistry(post)
+
+    object_post = gate.poster(main_window.object_tab_widget) if gate is not None else None
+    swerve_post = gate.poster(main_window.swerve_tab_widget) if gate is not None else None
+
+    registry.bind("Mode", Binding(main_window.arm_mode.setText, mode_text,
+                                  main_window.arm_mode_color.setColor,
+                                  {"Scoring": "#4caf50", "Picking_up": "#00bcd4"}, post=object_post))
+    registry.bind("Object", Binding(main_window.arm_obj.setText, object_text,
+                                    main_window.arm_obj_mode_color.setColor,
+                                    {"Cube": "#9c27b0", "Cone": "#fdd835"}, post=object_post))
+    registry.bind("ScorePos", Binding(main_window.s_p.setText, position_text, post=object_post))
+    registry.bind("PickPos", Binding(main_window.s_p.setText, position_text, post=object_post))
+
+    def swerve_binding(match):
+        module = getattr(main_window, f"swerve_mod_{match[1]}", None)
+        if module is None:
+            return None
+        return Binding(getattr(module, f"set{match[2]}Value"), sample=getattr(module, f"sample{match[2]}"),
+                       post=swerve_post)
+
+    registry.bind_pattern(r"Mod (\d) (Cancoder|Integrated|Velocity)", swerve_binding)
+
+    return registry
@@ -0,0 +1,330 @@
+"""
+RobotGUI
+Camera pre-roll, clip capture and continuous recording
+
+Clips and recording segments are stored the same way: a .mjpeg file with the
+JPEGs back to back, exactly as received, and a .csv index next to it with one
+line per frame (number, byte offset, length, wall clock time). The times are
+time.time() values like the telemetry log's, so frames line up with it.
+"""
+
+import collections
+import glob
+import logging
+import os
+import queue
+import re
+import threading
+import time
+
+from typing import Any, Callable, Iterable, Optional
+
+INDEX_HEADER = "frame,offset,length,time\n"
+
+SEGMENT_BYTES = 64 * 2 ** 20
+RETENTION_BYTES = 4 * 2 ** 30
+FLUSH_INTERVAL = 0.25  # seconds between batched writes of a SegmentRecorder
+MAX_PENDING = 32 * 2 ** 20  # bytes queued for the writer before frames are dropped
+
+
+class FrameRing:
+    """
+    The most recent compressed frames, in one buffer allocated up front
+
+    Frames are copied in back to back and the oldest ones are overwritten,
+    so memory use is fixed at capacity bytes and appending does not allocate
+    beyond a small index entry. Safe to append from one thread while others
+    read.
+    """
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+
+        self._lock = threading.Lock()
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)  # assigning a slice of a bytearray would copy the frame twice
+        self._frames = collections.deque()  # (timestamp, offset, length), oldest first
+        self._head = 0
+
+        self.appended = 0
+        self.too_large = 0
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def append(self, frame, timestamp: float) -> None:
+        """ Copy frame (bytes-like) into the ring """
+        length = len(frame)
+        if length > self.capacity:
+            self.too_large += 1
+            return
+
+        with self._lock:
+            frames = self._frames
+            start = self._head
+            if start + length > self.capacity:
+                # wrap around, the frames in the unused tail are the oldest
+                while frames and frames[0][1] >= start:
+                    frames.popleft()
+                start = 0
+            end = start + length
+            while frames and frames[0][1] < end and start < frames[0][1] + frames[0][2]:
+                frames.popleft()
+
+            self._view[start:end] = frame
+            frames.append((timestamp, start, length))
+            self._head = end
+            self.appended += 1
+
+    def span(self) -> float:
+        """ Seconds between the oldest and the newest frame """
+        with self._lock:
+            if not self._frames:
+                return 0.0
+            return self._frames[-1][0] - self._frames[0][0]
+
+    def copy(self, start: float, end: float) -> list:
+        """ [(timestamp, bytes)] of the frames with start <= timestamp <= end """
+        with self._lock:
+            return [(timestamp, bytes(self._view[offset:offset + length]))
+                    for timestamp, offset, length in self._frames if start <= timestamp <= end]
+
+
+def write_clip(path: str, frames: list, clock_offset: float) -> None:
+    """ Write frames and their index, clock_offset converts frame timestamps to time.time() """
+    offset = 0
+    with open(path, "wb") as video, open(os.path.splitext(path)[0] + ".csv", "w", encoding="UTF-8") as index:
+        index.write(INDEX_HEADER)
+        for number, (timestamp, jpeg) in enumerate(frames):
+            video.write(jpeg)
+            index.write(f"{number},{offset},{len(jpeg)},{timestamp + clock_offset:.6f}\n")
+            offset += len(jpeg)
+
+
+class ClipRecorder:
+    """
+    Saves the frames from before seconds before a trigger to after seconds after it
+
+    trigger() may be called from any thread, the clip is cut once after
+    seconds have passed and written on the recorder's own thread. Triggers
+    that fall inside a clip still being collected are part of that clip.
+    """
+    def __init__(self, ring: FrameRing, directory: str, before: float = 10.0, after: float = 2.0) -> None:
+        self.ring = ring
+        self.directory = directory
+        self.before = before
+        self.after = after
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending_until = 0.0
+        self._thread = threading.Thread(target=self._run, name="ClipRecorder", daemon=True)
+        self._thread.start()
+
+        self.saved = []
+
+    def trigger(self, reason: str, now: Optional[float] = None) -> None:
+        now = time.perf_counter() if now is None else now
+        with self._lock:
+            if now <= self._pending_until:
+                return
+            self._pending_until = now + self.after
+        logging.info(f"Saving camera clip: {reason}")
+        self._queue.put((now, reason))
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join(5)
+
+    def _run(self) -> None:
+        while (job := self._queue.get()) is not None:
+            triggered, reason = job
+            delay = triggered + self.after - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            frames = self.ring.copy(triggered - self.before, triggered + self.after)
+            if not frames:
+                logging.warning(f"No camera frames to save for {reason}")
+                continue
+
+            clock_offset = time.time() - time.perf_counter()
+            name = re.sub(r"[^A-Za-z0-9_.-]+", "_", reason)[:48]
+            path = os.path.join(self.directory, time.strftime("clip-%Y%m%d-%H%M%S-", time.localtime(
+                triggered + clock_offset)) + f"{name}.mjpeg")
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                write_clip(path, frames, clock_offset)
+            except OSError as e:
+                logging.error(f"Failed to save camera clip {path}: {e}")
+                continue
+            self.saved.append(path)
+            logging.info(f"Saved {len(frames)} frames to {path}")
+
+
+class ChangeTrigger:
+    """
+    Calls callback(reason) when one of keys changes value, the first value of a key does not count
+    """
+    def __init__(self, keys: Iterable[str], callback: Callable[[str], None]) -> None:
+        self.callback = callback
+
+        self._last = {key: None for key in keys}
+        self._seen = set()
+
+    def update(self, key: str, value: Any) -> None:
+        if key not in self._last:
+            return
+        last = self._last[key]
+        self._last[key] = value
+        if key in self._seen:
+            if value != last:
+                self.callback(f"{key.rsplit('/', 1)[-1]} {last} to {value}")
+        else:
+            self._seen.add(key)
+
+
+class SegmentRecorder:
+    """
+    Records every frame to rolling segment files in directory
+
+    append() only queues a copy of the frame, a writer thread writes what was
+    queued every flush_interval, or as soon as a quarter of max_pending is
+    queued. A segment is closed once it holds
+    segment_bytes, and the oldest segments, including those of earlier runs,
+    are deleted while all of them together exceed retention_bytes. If the disk
+    cannot keep up, frames beyond max_pending queued bytes are dropped instead
+    of growing memory.
+    """
+    def __init__(self, directory: str, segment_bytes: int = SEGMENT_BYTES, retention_bytes: int = RETENTION_BYTES,
+                 flush_interval: float = FLUSH_INTERVAL, max_pending: int = MAX_PENDING) -> None:
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.retention_bytes = retention_bytes
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        os.makedirs(directory, exist_ok=True)
+        self._segments = collections.deque((path, os.path.getsize(path)) for path in
+                                           sorted(glob.glob(os.path.join(directory, "camera-*.mjpeg"))))
+        self._enforce_retention()
+
+        self._clock_offset = time.time() - time.perf_counter()
+        self._video = None
+        self._index = None
+        self._path = None
+        self._offset = 0
+        self._frame = 0
+        self._failed = False
+
+        self._lock = threading.Lock()
+        self._pending = []
+        self._pending_bytes = 0
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+        self.frames = 0
+        self.bytes_written = 0
+        self.dropped = 0
+        self.segments = 0
+
+        self._writer = threading.Thread(target=self._write_loop, name="SegmentRecorder", daemon=True)
+        self._writer.start()
+
+    def append(self, frame, timestamp: float) -> None:
+        """ Queue a copy of frame (bytes-like), safe to call from any thread """
+        data = bytes(frame)
+        with self._lock:
+            if self._pending_bytes + len(data) > self.max_pending:
+                self.dropped += 1
+                return
+            self._pending.append((timestamp, data))
+            self._pending_bytes += len(data)
+            wake = self._pending_bytes >= self.max_pending // 4
+        if wake and not self._wake.is_set():
+            self._wake.set()
+
+    def stats(self) -> dict:
+        return {"frames": self.frames, "bytes_written": self.bytes_written, "dropped": self.dropped,
+                "segments": self.segments, "segment": self._path}
+
+    def close(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        self._writer.join()
+
+    def _write_loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._write_pending()
+        self._write_pending()
+        self._close_segment()
+
+    def _write_pending(self) -> None:
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            self._pending_bytes = 0
+
+        try:
+            for timestamp, jpeg in pending:
+                if self._video is None:
+                    self._open_segment(timestamp)
+                self._video.write(jpeg)
+                self._index.write(f"{self._frame},{self._offset},{len(jpeg)},{timestamp + self._clock_offset:.6f}\n")
+                self._frame += 1
+                self._offset += len(jpeg)
+                self.frames += 1
+                self.bytes_written += len(jpeg)
+                if self._offset >= self.segment_bytes:
+                    self._close_segment()
+            if self._video is not None:
+                # a crash then loses at most one batch, and the index still matches the video
+                self._video.flush()
+                self._index.flush()
+        except OSError as e:
+            if not self._failed:
+                logging.error(f"Failed to write camera recording to {self._path}: {e}")
+            self._failed = True
+            self._close_segment()
+            return
+        self._failed = False
+
+    def _open_segment(self, timestamp: float) -> None:
+        wall = timestamp + self._clock_offset
+        name = time.strftime("camera-%Y%m%d-%H%M%S", time.localtime(wall)) + f"-{int(wall * 1000) % 1000:03d}"
+        self._path = os.path.join(self.directory, name + ".mjpeg")
+        self._video = open(self._path, "wb", buffering=1024 * 1024)
+        self._index = open(os.path.join(self.directory, name + ".csv"), "w", encoding="UTF-8",
+                           buffering=64 * 1024)
+        self._index.write(INDEX_HEADER)
+        self._offset = 0
+        self._frame = 0
+
+    def _close_segment(self) -> None:
+        if self._video is None:
+            return
+        for file in (self._video, self._index):
+            try:
+                file.close()
+            except OSError as e:
+                logging.error(f"Failed to close camera recording {self._path}: {e}")
+        self._video = self._index = None
+        self._segments.append((self._path, self._offset))
+        self.segments += 1
+        self._enforce_retention()
+
+    def _enforce_retention(self) -> None:
+        total = sum(size for _, size in self._segments)
+        while self._segments and total > self.retention_bytes:
+            path, size = self._segments.popleft()
+            total -= size
+            for file in (path, os.path.splitext(path)[0] + ".csv"):
+                try:
+                    os.remove(file)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logging.error(f"Failed to delete old camera recording {file}: {e}")
+            logging.debug(f"Deleted old camera recording {path}")
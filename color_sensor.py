@@ -0,0 +1,95 @@
+"""
+RobotGUI
+Color sensor sample assembly
+"""
+
+import threading
+
+from typing import NamedTuple, Optional
+
+CHANNELS = {
+    "colorSensorRed": 0,
+    "colorSensorGreen": 1,
+    "colorSensorBlue": 2,
+    "colorSensorProx": 3,
+}
+_ALL_CHANNELS = (1 << len(CHANNELS)) - 1
+
+
+class ColorSample(NamedTuple):
+    red: float
+    green: float
+    blue: float
+    prox: float
+    timestamp: float
+
+
+class ColorSampleAssembler:
+    """
+    Groups the per-channel NetworkTables updates of the color sensor into whole samples
+
+    A sample is complete when every channel has been updated, when a channel
+    updates a second time, or when window seconds have passed since its first
+    channel (NetworkTables only sends channels that changed). Channels that did
+    not update keep their previous value.
+    """
+    def __init__(self, window: float = 0.01) -> None:
+        self.window = window
+
+        self._lock = threading.Lock()
+        self._values = [0.0] * len(CHANNELS)
+        self._seen = 0
+        self._first = 0.0
+
+        self.samples = 0
+        self._last_sample = None
+        self._interval = 0.0  # exponentially averaged, seconds
+        self._jitter = 0.0
+
+    def update(self, key: str, value, now: float) -> Optional[ColorSample]:
+        """ Add a channel update, returns a sample if this completed one """
+        channel = CHANNELS.get(key)
+        if channel is None:
+            return None
+        bit = 1 << channel
+
+        with self._lock:
+            sample = None
+            if self._seen & bit:
+                sample = self._complete(now)
+            if not self._seen:
+                self._first = now
+            self._values[channel] = float(value)
+            self._seen |= bit
+            if self._seen == _ALL_CHANNELS:
+                sample = self._complete(now)
+            return sample
+
+    def flush(self, now: float) -> Optional[ColorSample]:
+        """ Complete a partial sample that is older than the window """
+        with self._lock:
+            if self._seen and now - self._first >= self.window:
+                return self._complete(now)
+        return None
+
+    def _complete(self, now: float) -> ColorSample:
+        self._seen = 0
+        self.samples += 1
+
+        if self._last_sample is not None:
+            interval = now - self._last_sample
+            if self._interval:
+                self._jitter += (abs(interval - self._interval) - self._jitter) * 0.05
+                self._interval += (interval - self._interval) * 0.05
+            else:
+                self._interval = interval
+        self._last_sample = now
+
+        return ColorSample(*self._values, now)
+
+    def stats(self) -> dict:
+        return {
+            "samples": self.samples,
+            "rate_hz": 1 / self._interval if self._interval else 0.0,
+            "jitter_ms": self._jitter * 1000,
+        }
@@ -0,0 +1,251 @@
+"""
+RobotGUI
+Live diagnostics: handler latency, event loop lag, update rates and memory
+"""
+
+import json
+import logging
+import os
+import platform
+import time
+
+from typing import Callable, Optional
+
+from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
+                             QTableWidget, QTableWidgetItem, QPushButton, QFileDialog,
+                             QHeaderView)
+from PyQt6.QtCore import QObject, QTimer, Qt
+from PyQt6.QtGui import QFont
+
+import strings
+
+HISTOGRAM_BUCKETS = 24  # bucket i counts durations below 2**i microseconds, the last one everything above
+LAG_PROBE_INTERVAL = 10  # ms
+
+
+class LatencyHistogram:
+    """
+    log2 histogram of durations, recording is a few integer operations and never allocates
+
+    Not locked: a lost increment under contention is acceptable for diagnostics.
+    """
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.buckets[min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction: float) -> float:
+        """ Upper bound in seconds of the bucket holding the given fraction of the samples """
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return min(2 ** index / 1e6, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_us": self.total / self.count * 1e6 if self.count else 0.0,
+            "p50_us": self.percentile(0.5) * 1e6,
+            "p99_us": self.percentile(0.99) * 1e6,
+            "max_us": self.max * 1e6,
+            "buckets_us": {f"<{2 ** index}": count for index, count in enumerate(self.buckets) if count},
+        }
+
+
+class LoopLagProbe(QObject):
+    """
+    Measures how late a high frequency timer fires, which is how long the event loop was busy
+    """
+    def __init__(self, interval: int = LAG_PROBE_INTERVAL, parent=None) -> None:
+        super(LoopLagProbe, self).__init__(parent)
+
+        self.interval = interval
+        self.histogram = LatencyHistogram()
+        self._last = time.perf_counter()
+
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self._tick)
+        self._timer.start()
+
+    def _tick(self) -> None:
+        now = time.perf_counter()
+        self.histogram.record(max(0.0, now - self._last - self.interval / 1000))
+        self._last = now
+
+
+class KeyRates:
+    """ Per-key update rates from state.Slot update counts, between two calls of update """
+    def __init__(self) -> None:
+        self._counts = {}
+        self._time = None
+        self.rates = {}
+
+    def update(self, slots, now: float) -> dict:
+        elapsed = None if self._time is None else now - self._time
+        counts = {}
+        for slot in slots:
+            counts[slot.key] = slot.updates
+            if elapsed:
+                self.rates[slot.key] = (slot.updates - self._counts.get(slot.key, 0)) / elapsed
+        self._counts = counts
+        self._time = now
+        return self.rates
+
+
+class KeyValues:
+    """
+    repr() of the latest value of every key of a state.StateStore
+
+    Polls store.changed_since, so each update only renders the keys that
+    changed since the last one instead of every key.
+    """
+    def __init__(self, store) -> None:
+        self.store = store
+        self.version = 0
+        self.values = {}
+
+    def update(self) -> dict:
+        self.version, changed = self.store.changed_since(self.version)
+        for key, value in changed.items():
+            self.values[key] = repr(value)
+        return self.values
+
+
+def process_rss() -> Optional[int]:
+    """ Resident memory of this process in bytes, None if unknown """
+    if platform.system() == "Windows":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in ("PeakWorkingSetSize", "WorkingSetSize",
+                                                     "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                                                     "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage",
+                                                     "PagefileUsage", "PeakPagefileUsage")]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return None
+
+    try:
+        with open("/proc/self/statm", encoding="ascii") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class DiagnosticsWindow(QMainWindow):
+    """
+    Shows report() once a second while open, and exports report(False) as JSON
+
+    report(update_rates) must only measure rates when update_rates is True,
+    so an export does not disturb the once a second measurement.
+    """
+    def __init__(self, report: Callable[[bool], dict]) -> None:
+        super(DiagnosticsWindow, self).__init__()
+
+        self.report = report
+
+        self.setWindowTitle(strings.DIAG_TITLE)
+        self.resize(720, 640)
+
+        self.root_widget = QWidget()
+        self.setCentralWidget(self.root_widget)
+        self.root_layout = QVBoxLayout()
+        self.root_widget.setLayout(self.root_layout)
+
+        mono = QFont("monospace")
+        mono.setStyleHint(QFont.StyleHint.Monospace)
+
+        self.summary = QLabel()
+        self.summary.setFont(mono)
+        self.summary.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        self.root_layout.addWidget(self.summary)
+
+        self.keys = QTableWidget(0, 4)
+        self.keys.setHorizontalHeaderLabels([strings.DIAG_KEY, strings.DIAG_UPDATES, strings.DIAG_RATE,
+                                             strings.DIAG_VALUE])
+        self.keys.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.keys.verticalHeader().setVisible(False)
+        self.keys.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.root_layout.addWidget(self.keys)
+
+        self.button_layout = QHBoxLayout()
+        self.root_layout.addLayout(self.button_layout)
+        self.button_layout.addStretch()
+
+        self.export_button = QPushButton(strings.DIAG_EXPORT)
+        self.export_button.clicked.connect(self.export)
+        self.button_layout.addWidget(self.export_button)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, a0) -> None:
+        super(DiagnosticsWindow, self).showEvent(a0)
+        self.refresh()
+        self.timer.start()
+
+    def hideEvent(self, a0) -> None:
+        super(DiagnosticsWindow, self).hideEvent(a0)
+        self.timer.stop()
+
+    def refresh(self) -> None:
+        report = self.report()
+
+        lines = []
+        lag = report["event_loop_lag"]
+        lines.append(strings.DIAG_LAG.format(lag["p50_us"] / 1000, lag["p99_us"] / 1000, lag["max_us"] / 1000))
+        for name in ("value_changed", "color_value_changed"):
+            handler = report["handlers"][name]
+            lines.append(strings.DIAG_HANDLER.format(name, handler["count"], handler["p50_us"], handler["p99_us"],
+                                                     handler["max_us"]))
+        ui = report["ui_updates"]
+        lines.append(strings.DIAG_UPDATES_SUMMARY.format(ui["received"], ui["applied"], ui["coalesced"],
+                                                         ui.get("held", 0)))
+        rss = report["rss_bytes"]
+        lines.append(strings.DIAG_RSS.format(rss / 2 ** 20 if rss is not None else float("nan")))
+        self.summary.setText("\n".join(lines))
+
+        keys = sorted(report["keys"].items(), key=lambda item: item[1]["rate_hz"], reverse=True)
+        self.keys.setRowCount(len(keys))
+        for row, (key, info) in enumerate(keys):
+            for column, text in enumerate((key, str(info["updates"]), f"{info['rate_hz']:.1f}", info["value"])):
+                item = self.keys.item(row, column)
+                if item is None:
+                    self.keys.setItem(row, column, QTableWidgetItem(text))
+                elif item.text() != text:
+                    item.setText(text)
+
+    def export(self) -> None:
+        path, _ = QFileDialog.getSaveFileName(self, strings.DIAG_EXPORT,
+                                              time.strftime("diagnostics-%Y%m%d-%H%M%S.json"), "JSON (*.json)")
+        if not path:
+            return
+        try:
+            with open(path, "w", encoding="UTF-8") as file:
+                json.dump(self.report(False), file, indent=2)
+        except OSError as e:
+            logging.error(f"Failed to export diagnostics to {path}: {e}")
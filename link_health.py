@@ -0,0 +1,149 @@
+"""
+RobotGUI
+NetworkTables link health
+"""
+
+import logging
+import threading
+
+from typing import NamedTuple, Optional
+
+import state
+
+STALE_AFTER = 0.5  # seconds without an update before data counts as stale
+LATE_FACTOR = 3.0  # a key is late once it has gone this many of its periods without an update
+MIN_UPDATES = 3  # updates of a key before its period is trusted
+KEY_SCAN_INTERVAL = 0.1  # seconds between scans for late keys
+
+
+class HealthSnapshot(NamedTuple):
+    connected: bool
+    since: Optional[float]  # seconds in the current state, None before the first connection event
+    age: Optional[float]  # seconds since the last update, None before the first update
+    gap_avg: float  # seconds, exponentially averaged time between updates
+    gap_max: float  # seconds, longest time between updates within the last second
+    late_keys: int  # keys overdue against their own update period
+    keys: int
+    reconnects: int
+    last_outage: Optional[float]  # seconds the last disconnect lasted
+    stale: bool  # connected, but the heartbeat (or any data, without one) is overdue
+
+
+class LinkHealth:
+    """
+    Link statistics, fed from the NetworkTables listener threads and read on the GUI thread
+
+    Times are time.perf_counter() values passed in by the caller. NetworkTables
+    only sends values that changed, so a quiet link is not a dead one: the
+    data counts as stale when the heartbeat key, a value the robot changes
+    on a fixed period, is overdue. Without a heartbeat it only counts as stale
+    when nothing at all arrived within stale_after of connecting. Per-key
+    lateness comes from the slots of store, which the caller keeps updated.
+    """
+    def __init__(self, store: state.StateStore, stale_after: float = STALE_AFTER,
+                 heartbeat: Optional[str] = None) -> None:
+        self.store = store
+        self.stale_after = stale_after
+        self.heartbeat = heartbeat  # "Table/key"
+
+        self._lock = threading.Lock()
+
+        self.connected = False
+        self._changed = None
+        self.reconnects = 0
+        self.last_outage = None
+        self._ever_connected = False
+
+        self._last_update = None
+        self._gap_from = None
+        self._gap_avg = 0.0
+        self._gap_max = 0.0
+        self._window_max = 0.0
+        self._window_start = None
+
+        self._late_keys = 0
+        self._next_scan = 0.0
+
+        self._reconnect_started = None
+        self.time_to_data = None  # seconds from the last reconnecting() call to the first update after it
+
+    def connection_changed(self, connected: bool, now: float) -> None:
+        with self._lock:
+            if connected == self.connected and self._changed is not None:
+                return
+            if connected:
+                if self._ever_connected:
+                    self.reconnects += 1
+                    self.last_outage = now - self._changed
+                self._ever_connected = True
+            else:
+                # the gap over an outage says nothing about the link quality
+                self._gap_from = None
+            self.connected = connected
+            self._changed = now
+
+    def reconnecting(self, now: float) -> None:
+        """ The connection is being rebuilt on purpose, time how long until data flows again """
+        self.connection_changed(False, now)
+        with self._lock:
+            self._reconnect_started = now
+            self.time_to_data = None
+
+    def update(self, now: float) -> None:
+        with self._lock:
+            if self._reconnect_started is not None:
+                self.time_to_data = now - self._reconnect_started
+                self._reconnect_started = None
+                logging.info(f"First value {self.time_to_data * 1000:.0f} ms after reconnecting")
+
+            if self._gap_from is not None:
+                gap = now - self._gap_from
+                self._gap_avg += (gap - self._gap_avg) * 0.05
+                self._window_max = max(self._window_max, gap)
+            self._last_update = self._gap_from = now
+
+            if self._window_start is None:
+                self._window_start = now
+            elif now - self._window_start >= 1.0:
+                self._gap_max = self._window_max
+                self._window_max = 0.0
+                self._window_start = now
+
+    def _stale(self, now: float) -> bool:
+        if not self.connected:
+            return False
+        if self.heartbeat is None:
+            last = self._last_update
+        else:
+            slot = self.store.slot(self.heartbeat)
+            last = None if slot is None else slot.timestamp
+        if last is None or last < self._changed:
+            return now - self._changed > self.stale_after
+        if self.heartbeat is None:
+            return False
+
+        overdue = self.stale_after
+        if slot.updates >= MIN_UPDATES:
+            overdue = max(overdue, LATE_FACTOR * slot.period)
+        return now - slot.timestamp > overdue
+
+    def snapshot(self, now: float) -> HealthSnapshot:
+        with self._lock:
+            if now >= self._next_scan:
+                # a scan is O(keys quiet for stale_after), so it runs at KEY_SCAN_INTERVAL rather than every frame
+                self._late_keys = self.store.count_late(now, self.stale_after, LATE_FACTOR, MIN_UPDATES)
+                self._next_scan = now + KEY_SCAN_INTERVAL
+
+            age = None if self._last_update is None else now - self._last_update
+            return HealthSnapshot(
+                connected=self.connected,
+                since=None if self._changed is None else now - self._changed,
+                age=age,
+                gap_avg=self._gap_avg,
+                gap_max=max(self._gap_max, self._window_max, age if age is not None and self.connected else 0.0),
+                late_keys=self._late_keys,
+                keys=len(self.store),
+                reconnects=self.reconnects,
+                last_outage=self.last_outage,
+                stale=self._stale(now),
+            )
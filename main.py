@@ -5,14 +5,19 @@ RobotGUI
 # System
 import logging
 import argparse
-import json
 import platform
+import re
 import sys
 import os
-import re
+import time
 
 from typing import Final
 
+import startup
+
+startup_profile = startup.StartupProfile()
+startup_profile.track_imports()
+
 # Qt
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QMenuBar, QLabel,
                              QTabWidget, QWidget, QGridLayout,
@@ -20,29 +25,33 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QMenuBar, QLabel,
                              QProgressBar, QToolBar, QToolButton,
                              QPushButton)
 from PyQt6.QtGui import QFont, QIcon, QCloseEvent, QGuiApplication
-from PyQt6.QtCore import QSize, QTimer, QUrl, Qt
-from PyQt6.QtWebEngineWidgets import QWebEngineView
-
-# Misc GUI
-from qt_thread_updater import get_updater
-import qt_material
-import qtawesome
+from PyQt6.QtCore import QEvent, QSize, QTimer, Qt
 
 # Windows 10/11
 if platform.system() == "Windows":
     from ctypes import byref, c_bool, sizeof, windll
     from ctypes.wintypes import BOOL
 
-# Misc
-from networktables import NetworkTables
-import stringcase
-
 import about
+import bindings
+import camera
+import clips
+import color_sensor
+import diagnostics
+import link_health
+import plotting
+import replay
+import scheduler
+import settings_store
+import state
 import strings
+import telemetry
+import theme
 import widgets
 
 import update_checker
 
+startup_profile.stop_imports()
 
 __version__: Final[str] = "0.6.0"
 
@@ -50,134 +59,169 @@ DEFAULT_SETTINGS: Final[dict] = {
     "log_level": 20,
     "dark_mode": True,
     "ip": "10.63.69.2",
-    "camera_http": "http://10.63.69.14:1181/stream.mjpg?1680129953477",
+    "heartbeat_key": "",
+    "camera_http": ["http://10.63.69.14:1181/stream.mjpg?1680129953477"],
+    "camera_layout": "pip",
+    "camera_decode_workers": 2,
+    "camera_secondary_fps": 10,
+    "camera_overlay": False,
     "camera_screen": 1,
     "cam_fullscreen": True,
     "first_run": True,
     "repo": "meowmeowahr/RobotGUI-2023",
-    "show_updates": True
+    "show_updates": True,
+    "update_check_hours": 6,
+    "ui_frame_rate": 60,
+    "plot_seconds": 60,
+    "record_telemetry": True,
+    "telemetry_dir": "",
+    "telemetry_retention_mb": 1024,
+    "clip_buffer_mb": 64,
+    "clip_seconds": 10,
+    "clip_after_seconds": 2,
+    "clip_triggers": ["SmartDashboard/Mode", "SmartDashboard/Object"],
+    "clip_dir": "",
+    "camera_record": False,
+    "camera_segment_mb": 64,
+    "camera_retention_mb": 4096,
+    "camera_record_dir": ""
 }
 
+SD_TABLE: Final[str] = "SmartDashboard"
+COLOR_TABLE: Final[str] = "RevColorSensor_V3"
+
 # parse command line args
 parser = argparse.ArgumentParser()
 parser.add_argument("-s", "--settings", help="location of settings file",
                     required=False,
                     default=os.path.join(os.path.dirname(os.path.realpath(__file__)),
                                          "settings.json"))
-args = parser.parse_args()
-
-red = 0
-green = 0
-blue = 0
-prox = 0
+parser.add_argument("--replay", metavar="LOG", help="drive the GUI from a recorded telemetry log instead of the robot")
+parser.add_argument("--replay-speed", type=float, default=1.0, help="replay speed, 1 = real time, 0 = max speed")
+parser.add_argument("--replay-start", type=float, default=0.0, metavar="SECONDS",
+                    help="start the replay this many seconds into the log")
+parser.add_argument("--startup-profile", action="store_true",
+                    help="print how long each import and startup step took, up to the first frame")
+
+args = None
+window = None
+cam = None
+player = None
+ui_scheduler = None
+sd_bindings = None
+recorder = None
+theme_cache = None
+store = None
+nt_server = None
+page_gate = None
+color_post = None  # posts color tab updates, through page_gate once it exists
+clip_trigger = None
+
+color_assembler = color_sensor.ColorSampleAssembler()
+telemetry_state = state.StateStore()  # latest value of every key, "Table/key"
+health = link_health.LinkHealth(telemetry_state)
+
+value_latency = diagnostics.LatencyHistogram()
+color_latency = diagnostics.LatencyHistogram()
+key_rates = diagnostics.KeyRates()
+key_values = diagnostics.KeyValues(telemetry_state)
+loop_lag = None
 
 
 def value_changed(_, key, value, is_new):
     """ Callback for Network Tables """
-    logging.debug(f"valueChanged: key: '{key}'; value: {value}; isNew: {is_new}")
-
-    if "window" in globals().keys():
-        if key == 'Mode':
-            get_updater().call_latest(window.arm_mode.setText, str(value).replace("_", " ").title())
-            if str(value) == "Scoring":
-                get_updater().call_latest(window.arm_mode_color.setColor, "#4caf50")
-            elif str(value) == "Picking_up":
-                get_updater().call_latest(window.arm_mode_color.setColor, "#00bcd4")
-            else:
-                get_updater().call_latest(window.arm_mode_color.setColor, "#fafafa")
-        elif key == 'Object':
-            get_updater().call_latest(window.arm_obj.setText, str(value).replace('Neither', 'None')
-                                      .replace("_", " ").title())
-            if str(value) == "Cube":
-                get_updater().call_latest(window.arm_obj_mode_color.setColor, "#9c27b0")
-            elif str(value) == "Cone":
-                get_updater().call_latest(window.arm_obj_mode_color.setColor, "#fdd835")
-            else:
-                get_updater().call_latest(window.arm_obj_mode_color.setColor, "#fafafa")
-        elif key == 'ScorePos':
-            get_updater().call_latest(window.s_p.setText,
-                                      stringcase.titlecase(str(value).replace('Neither', 'None')))
-        elif key == 'PickPos':
-            get_updater().call_latest(window.s_p.setText,
-                                      stringcase.titlecase(str(value).replace('Neither', 'None')))
-        elif re.match(r"Mod \d Cancoder", key):
-            module = int(str(key)[4])
-            if module == 0:
-                get_updater().call_latest(window.swerve_mod_0.setCancoderValue, value)
-            elif module == 1:
-                get_updater().call_latest(window.swerve_mod_1.setCancoderValue, value)
-            elif module == 2:
-                get_updater().call_latest(window.swerve_mod_2.setCancoderValue, value)
-            elif module == 3:
-                get_updater().call_latest(window.swerve_mod_3.setCancoderValue, value)
-        elif re.match(r"Mod \d Integrated", key):
-            module = int(str(key)[4])
-            if module == 0:
-                get_updater().call_latest(window.swerve_mod_0.setIntegratedValue, value)
-            elif module == 1:
-                get_updater().call_latest(window.swerve_mod_1.setIntegratedValue, value)
-            elif module == 2:
-                get_updater().call_latest(window.swerve_mod_2.setIntegratedValue, value)
-            elif module == 3:
-                get_updater().call_latest(window.swerve_mod_3.setIntegratedValue, value)
-        elif re.match(r"Mod \d Velocity", key):
-            module = int(str(key)[4])
-            if module == 0:
-                get_updater().call_latest(window.swerve_mod_0.setVelocityValue, value)
-            elif module == 1:
-                get_updater().call_latest(window.swerve_mod_1.setVelocityValue, value)
-            elif module == 2:
-                get_updater().call_latest(window.swerve_mod_2.setVelocityValue, value)
-            elif module == 3:
-                get_updater().call_latest(window.swerve_mod_3.setVelocityValue, value)
+    logging.debug("valueChanged: key: '%s'; value: %s; isNew: %s", key, value, is_new)
+
+    now = time.perf_counter()
+    name = f"{SD_TABLE}/{key}"
+    telemetry_state.update(name, value, now)
+    health.update(now)
+    if recorder is not None:
+        recorder.record(name, value)
+    if clip_trigger is not None:
+        clip_trigger.update(name, value)
+
+    if sd_bindings is not None:
+        sd_bindings.dispatch(key, value)
+
+    value_latency.record(time.perf_counter() - now)
 
 
 def color_value_changed(_, key, value, is_new):
     """ Callback for Network Tables """
-    global red, green, blue, prox
-    logging.debug(f"colorValueChanged: key: '{key}'; value: {value}; isNew: {is_new}")
-
-    if "window" in globals().keys():
-        if key == "colorSensorRed":
-            red = float(value)
-            get_updater().call_latest(window.color_red.setText, f"Red: {red}")
-            get_updater().call_latest(window.color_red_bar.setValue, int(red))
-        elif key == "colorSensorGreen":
-            green = float(value)
-            get_updater().call_latest(window.color_green.setText, f"Green: {green}")
-            get_updater().call_latest(window.color_green_bar.setValue, int(green))
-        elif key == "colorSensorBlue":
-            blue = float(value)
-            get_updater().call_latest(window.color_blue.setText, f"Blue: {blue}")
-            get_updater().call_latest(window.color_blue_bar.setValue, int(blue))
-        elif key == "colorSensorProx":
-            prox = float(value)
-            get_updater().call_latest(window.color_prox.setText, f"Prox: {prox}")
-            get_updater().call_latest(window.color_prox_bar.setValue, int(prox))
-
-        get_updater().call_latest(window.color.setRGB, red, green, blue)
+    logging.debug("colorValueChanged: key: '%s'; value: %s; isNew: %s", key, value, is_new)
+
+    now = time.perf_counter()
+    name = f"{COLOR_TABLE}/{key}"
+    telemetry_state.update(name, value, now)
+    health.update(now)
+    if recorder is not None:
+        recorder.record(name, value)
+
+    if window is not None:
+        sample = color_assembler.update(key, value, now)
+        if sample is not None:
+            apply_color_sample(sample)
+
+    color_latency.record(time.perf_counter() - now)
+
+
+def connection_changed(connected, info):
+    """ Connection listener for Network Tables """
+    logging.info(f"NetworkTables {'connected to' if connected else 'disconnected from'} {info.remote_ip}")
+
+    health.connection_changed(connected, time.perf_counter())
+    if window is not None:
+        ui_scheduler.post(window.update_conns, connected)
+
+
+def flush_color_sample():
+    """ Frame hook, shows a partial color sample once its assembly window has passed """
+    sample = color_assembler.flush(time.perf_counter())
+    if sample is not None:
+        apply_color_sample(sample)
+
+
+def apply_color_sample(sample: color_sensor.ColorSample):
+    window.color_plot.append(0, sample.red)
+    window.color_plot.append(1, sample.green)
+    window.color_plot.append(2, sample.blue)
+    window.color_prox_plot.append(0, sample.prox)
+
+    (color_post or ui_scheduler.post)(window.show_color_sample, sample)
+
+
+def apply_theme(dark: bool) -> None:
+    global theme_cache
+    if theme_cache is None:
+        theme_cache = theme.ThemeCache(os.path.join(cache_dir(), "theme"),
+                                       os.path.join(os.path.dirname(os.path.realpath(__file__)), "material-fixes.qss"))
+
+    theme_cache.apply(app, "dark_red.xml" if dark else "light_red.xml")
 
 
 def enable_setting(key, enabled=True):
     settings[key] = enabled
 
     if key == "dark_mode":
-        if settings["dark_mode"]:
-            qt_material.apply_stylesheet(app, theme="dark_red.xml", css_file="material-fixes.qss")
-        else:
-            qt_material.apply_stylesheet(app, theme="light_red.xml", css_file="material-fixes.qss")
+        apply_theme(settings["dark_mode"])
 
         if platform.system() == "Windows":
-            window.setup.set_windows_dark(settings["dark_mode"])
+            if window.setup is not None:
+                window.setup.set_windows_dark(settings["dark_mode"])
             window.set_windows_dark(settings["dark_mode"])
-            cam.set_windows_dark(settings["dark_mode"])
+            if cam is not None:
+                cam.set_windows_dark(settings["dark_mode"])
+
+        if cam is not None:
+            cam.update_icons()
 
     save_settings()
 
 
 def save_settings():
-    with open(args.settings, "w", encoding="UTF-8") as file:
-        json.dump(settings, file, indent=2)
+    """ Written a moment later on the store's thread, see settings_store.SettingsStore """
+    store.save(settings)
 
 
 def update_setting(key, value):
@@ -186,11 +230,176 @@ def update_setting(key, value):
     save_settings()
 
 
+def start_networktables(server) -> None:
+    """
+    Connect to server (an address or (address, port)) and listen to the tables RobotGUI shows
+
+    Call this once the bindings exist, values the robot already sent are delivered immediately.
+    """
+    global nt_server
+    from networktables import NetworkTables
+
+    nt_server = server
+    NetworkTables.initialize(server=server)
+    NetworkTables.getTable(SD_TABLE).addEntryListener(value_changed, immediateNotify=True)
+    NetworkTables.getTable(COLOR_TABLE).addEntryListener(color_value_changed, immediateNotify=True)
+    NetworkTables.addConnectionListener(connection_changed, immediateNotify=True)
+
+
+def reconnect_networktables(server) -> None:
+    """ Drop the connection and its listeners and connect to server instead """
+    from networktables import NetworkTables
+
+    health.reconnecting(time.perf_counter())
+    NetworkTables.shutdown()
+    start_networktables(server)
+
+
+def change_robot_address(ip: str) -> None:
+    """ Reconnect to the robot at ip, if NetworkTables is running """
+    if nt_server is None or ip == nt_server:
+        return
+
+    logging.info(f"Reconnecting NetworkTables to {ip}")
+    window.connection_status_widget.setText(strings.CONN_NOT_CONNECTED.format(ip))
+    reconnect_networktables(ip)
+
+
+def camera_urls(text: str) -> list:
+    """ The camera URLs in text, separated by commas or spaces """
+    return [url for url in re.split(r"[\s,]+", text) if url]
+
+
+def change_camera_urls(urls: list) -> None:
+    if cam is not None:
+        cam.set_urls(urls)
+
+
+def migrate_settings(loaded: dict) -> bool:
+    """ Update settings written by older versions, returns True if anything changed """
+    if isinstance(loaded["camera_http"], str):
+        loaded["camera_http"] = camera_urls(loaded["camera_http"])
+        return True
+    return False
+
+
+def start_recorder() -> telemetry.TelemetryRecorder:
+    directory = settings["telemetry_dir"] or os.path.join(os.path.dirname(os.path.realpath(args.settings)),
+                                                          "telemetry")
+    os.makedirs(directory, exist_ok=True)
+    # logs of earlier runs are trimmed once per launch, the one being written is never deleted
+    telemetry.enforce_retention(directory, int(settings["telemetry_retention_mb"] * 2 ** 20))
+    path = os.path.join(directory, time.strftime("telemetry-%Y%m%d-%H%M%S.rgtl"))
+    logging.info(f"Recording telemetry to {path}")
+    return telemetry.TelemetryRecorder(path)
+
+
+def clip_dir() -> str:
+    return settings["clip_dir"] or os.path.join(os.path.dirname(os.path.realpath(args.settings)), "clips")
+
+
+def camera_record_dir() -> str:
+    return settings["camera_record_dir"] or os.path.join(os.path.dirname(os.path.realpath(args.settings)), "video")
+
+
+def update_cache_path() -> str:
+    return os.path.join(os.path.dirname(os.path.realpath(args.settings)), "update_cache.json")
+
+
+def cache_dir() -> str:
+    """ Rendered themes and icons, safe to delete """
+    return os.path.join(os.path.dirname(os.path.realpath(args.settings)), "cache")
+
+
+def start_bindings() -> None:
+    """ Routes NetworkTables values to the main window's widgets, through a PageGate on its current tab """
+    global sd_bindings, page_gate, color_post
+    page_gate = scheduler.PageGate(ui_scheduler.post)
+    color_post = page_gate.poster(window.color_tab_widget)
+    window.update_visible_pages()
+    sd_bindings = bindings.create_bindings(window, ui_scheduler.post, page_gate)
+    ui_scheduler.add_frame_hook(flush_color_sample)
+    ui_scheduler.add_frame_hook(window.update_health)
+
+
+def finish_startup(replay_reader=None) -> None:
+    """ Everything the first frame of the main window does not need, run right after that frame """
+    global player, recorder, cam, clip_trigger
+    startup_profile.mark_first_frame()
+
+    with startup_profile.phase("bindings"):
+        start_bindings()
+
+    if replay_reader is not None:
+        with startup_profile.phase("replay"):
+            player = replay.TelemetryReplay(replay_reader, {SD_TABLE: value_changed,
+                                                            COLOR_TABLE: color_value_changed}, args.replay_speed)
+            player.start(args.replay_start)
+    else:
+        if settings["record_telemetry"]:
+            try:
+                recorder = start_recorder()
+            except OSError as e:
+                logging.error(f"Telemetry recording disabled: {e}")
+
+        with startup_profile.phase("networktables"):
+            start_networktables(settings["ip"])
+
+    with startup_profile.phase("camera window"):
+        cam = CamMonitor()
+        if cam.clips is not None and replay_reader is None:
+            clip_trigger = clips.ChangeTrigger(settings["clip_triggers"], cam.save_clip)
+
+    if settings["show_updates"]:
+        with startup_profile.phase("update check"):
+            window.start_update_check()
+
+    logging.info(f"First frame after {startup_profile.first_frame * 1000:.0f} ms")
+    if args.startup_profile:
+        print(startup_profile.report())
+
+
+def diagnostics_report(update_rates: bool = True) -> dict:
+    """
+    Everything the diagnostics window shows, JSON serializable
+
+    Per-key rates are measured between calls that update them, other calls
+    (exports) reuse the last rates instead of measuring over a few milliseconds.
+    """
+    now = time.perf_counter()
+    slots = telemetry_state.slots()
+    rates = key_rates.update(slots, now) if update_rates else key_rates.rates
+    values = key_values.update()
+
+    ui_updates = ui_scheduler.stats()
+    if page_gate is not None:
+        ui_updates.update(page_gate.stats())
+
+    return {
+        "time": time.time(),
+        "version": __version__,
+        "handlers": {"value_changed": value_latency.to_dict(), "color_value_changed": color_latency.to_dict()},
+        "event_loop_lag": (loop_lag.histogram if loop_lag is not None else diagnostics.LatencyHistogram()).to_dict(),
+        "ui_updates": ui_updates,
+        "rss_bytes": diagnostics.process_rss(),
+        "link": health.snapshot(now)._asdict(),
+        "color_sensor": color_assembler.stats(),
+        "camera_recording": cam.recording.stats() if cam is not None and cam.recording is not None else None,
+        "keys": {slot.key: {"updates": slot.updates, "rate_hz": rates.get(slot.key, 0.0),
+                            "value": values.get(slot.key) or repr(slot.value)} for slot in slots},
+    }
+
+
 def close_all_windows():
-    window.setup.close()
-    window.about.close()
+    if window.setup is not None:
+        window.setup.close()
+    if window.about is not None:
+        window.about.close()
+    if window.diagnostics is not None:
+        window.diagnostics.close()
     window.close()
-    cam.close()
+    if cam is not None:
+        cam.close()
 
 
 class MainWindow(QMainWindow):
@@ -207,17 +416,18 @@ class MainWindow(QMainWindow):
         # Menu
         self.menu = QMenuBar(self)
 
-        self.about = about.AboutBox()
-        self.about.version.setText(__version__)
-
-        self.setup = Settings()
+        # created when first opened
+        self.about = None
+        self.setup = None
+        self.diagnostics = None
 
         self.file_menu = self.menu.addMenu(strings.MENU_FILE)
-        self.file_menu.addAction(strings.MENU_SETUP, self.setup.show)
+        self.file_menu.addAction(strings.MENU_SETUP, self.show_setup)
         self.file_menu.addAction(strings.MENU_QUIT, self.close)
 
         self.help_menu = self.menu.addMenu(strings.MENU_HELP)
-        self.help_menu.addAction(strings.MENU_ABOUT, self.about.show)
+        self.help_menu.addAction(strings.MENU_DIAGNOSTICS, self.show_diagnostics)
+        self.help_menu.addAction(strings.MENU_ABOUT, self.show_about)
         self.help_menu.addAction(strings.MENU_ABOUT_QT, QApplication.instance().aboutQt)
 
         self.setMenuBar(self.menu)
@@ -232,23 +442,18 @@ class MainWindow(QMainWindow):
         self.connection_status_widget = widgets.StatusBar(strings.CONN_NOT_CONNECTED.format(settings["ip"]))
         self.root_layout.addWidget(self.connection_status_widget)
 
-        self.connection_timer = QTimer()
-        self.connection_timer.setInterval(1000)
-        self.connection_timer.timeout.connect(self.update_conns)
-        self.connection_timer.start()
+        self.health_strip = widgets.HealthStrip()
+        self.root_layout.addWidget(self.health_strip)
 
-        # Update
-        if settings["show_updates"]:
-            self.versions = update_checker.UpdateChecker(settings["repo"], __version__.strip("v"))  # GitHub releases
-
-            self.update_status_widget = widgets.StatusBar(strings.UPDATE_AVAIL.format(self.versions.latest,
-                                                                                      self.versions.current),
-                                                          closeable=True, severity=widgets.Serverity.WARN)
-            self.update_status_widget.setVisible(self.versions.newer_available)
-            self.root_layout.addWidget(self.update_status_widget)
+        # Update, started by start_update_check after the first frame
+        self.versions = None
+        self.update_status_widget = widgets.StatusBar("", closeable=True, severity=widgets.Serverity.WARN)
+        self.update_status_widget.setVisible(False)
+        self.root_layout.addWidget(self.update_status_widget)
 
         # Tabs
         self.tab_widget = QTabWidget(self)
+        self.tab_widget.currentChanged.connect(self.update_visible_pages)
         self.root_layout.addWidget(self.tab_widget)
 
         self.object_tab_widget = QWidget()
@@ -346,19 +551,46 @@ class MainWindow(QMainWindow):
         self.color_prox_bar.setRange(0, 65535)
         self.color_side_layout.addWidget(self.color_prox_bar)
 
+        self.color_stats = QLabel(strings.COLOR_STATS.format(0, 0))
+        self.color_side_layout.addWidget(self.color_stats)
+
+        self.color_stats_timer = QTimer()
+        self.color_stats_timer.setInterval(1000)
+        self.color_stats_timer.timeout.connect(self.update_color_stats)
+        self.color_stats_timer.start()
+
+        self.color_plot_layout = QVBoxLayout()
+        self.color_tab_layout.addLayout(self.color_plot_layout)
+
+        self.color_plot = widgets.TimeSeriesPlot(strings.PLOT_COLOR, [("Red", "#f44336"), ("Green", "#4caf50"),
+                                                                      ("Blue", "#2196f3")], settings["plot_seconds"])
+        self.color_plot_layout.addWidget(self.color_plot)
+
+        self.color_prox_plot = widgets.TimeSeriesPlot(strings.PLOT_PROX, [("Prox", "#9e9e9e")],
+                                                      settings["plot_seconds"])
+        self.color_plot_layout.addWidget(self.color_prox_plot)
+
         # Swerve
-        self.swerve_mod_0 = widgets.Swerve(strings.SWERVE_MOD.format(0))
+        self.swerve_mod_0 = widgets.Swerve(strings.SWERVE_MOD.format(0), settings["plot_seconds"])
         self.swerve_tab_layout.addWidget(self.swerve_mod_0, 0, 0)
 
-        self.swerve_mod_1 = widgets.Swerve(strings.SWERVE_MOD.format(1))
+        self.swerve_mod_1 = widgets.Swerve(strings.SWERVE_MOD.format(1), settings["plot_seconds"])
         self.swerve_tab_layout.addWidget(self.swerve_mod_1, 0, 1)
 
-        self.swerve_mod_2 = widgets.Swerve(strings.SWERVE_MOD.format(2))
+        self.swerve_mod_2 = widgets.Swerve(strings.SWERVE_MOD.format(2), settings["plot_seconds"])
         self.swerve_tab_layout.addWidget(self.swerve_mod_2, 1, 0)
 
-        self.swerve_mod_3 = widgets.Swerve(strings.SWERVE_MOD.format(3))
+        self.swerve_mod_3 = widgets.Swerve(strings.SWERVE_MOD.format(3), settings["plot_seconds"])
         self.swerve_tab_layout.addWidget(self.swerve_mod_3, 1, 1)
 
+        # one repaint tick for every plot
+        self.plot_ticker = plotting.PlotTicker()
+        for plot in (self.color_plot, self.color_prox_plot):
+            self.plot_ticker.add(plot)
+        for module in (self.swerve_mod_0, self.swerve_mod_1, self.swerve_mod_2, self.swerve_mod_3):
+            for plot in module.plots:
+                self.plot_ticker.add(plot)
+
         if platform.system() == "Windows":
             self.set_windows_dark(settings["dark_mode"])
 
@@ -368,11 +600,92 @@ class MainWindow(QMainWindow):
         if platform.system() == "Windows":
             windll.LoadLibrary("dwmapi").DwmSetWindowAttribute(int(self.winId()), 20, byref(c_bool(dark)), sizeof(BOOL))
 
-    def update_conns(self):
-        self.connection_status_widget.setVisible(not NetworkTables.isConnected())
+    def show_color_sample(self, sample: color_sensor.ColorSample):
+        self.color_red.setText(f"Red: {sample.red}")
+        self.color_red_bar.setValue(int(sample.red))
+        self.color_green.setText(f"Green: {sample.green}")
+        self.color_green_bar.setValue(int(sample.green))
+        self.color_blue.setText(f"Blue: {sample.blue}")
+        self.color_blue_bar.setValue(int(sample.blue))
+        self.color_prox.setText(f"Prox: {sample.prox}")
+        self.color_prox_bar.setValue(int(sample.prox))
+        self.color.setRGB(sample.red, sample.green, sample.blue)
+
+    def update_visible_pages(self):
+        """ Only the current tab of a visible, not minimized window gets per-update widget calls """
+        if page_gate is None:
+            return
+        if self.isVisible() and not self.isMinimized():
+            page_gate.set_visible({self.tab_widget.currentWidget()})
+        else:
+            page_gate.set_visible(())
+
+    def changeEvent(self, a0: QEvent) -> None:
+        super(MainWindow, self).changeEvent(a0)
+        if a0.type() == QEvent.Type.WindowStateChange:
+            self.update_visible_pages()
+
+    def showEvent(self, a0) -> None:
+        super(MainWindow, self).showEvent(a0)
+        self.update_visible_pages()
+
+    def hideEvent(self, a0) -> None:
+        super(MainWindow, self).hideEvent(a0)
+        self.update_visible_pages()
+
+    def update_color_stats(self):
+        if not self.color_stats.isVisible():
+            return
+        stats = color_assembler.stats()
+        self.color_stats.setText(strings.COLOR_STATS.format(stats["rate_hz"], stats["jitter_ms"]))
+
+    def show_setup(self):
+        if self.setup is None:
+            self.setup = Settings()
+        self.setup.show()
+
+    def show_about(self):
+        if self.about is None:
+            self.about = about.AboutBox()
+            self.about.version.setText(__version__)
+        self.about.show()
+
+    def show_diagnostics(self):
+        if self.diagnostics is None:
+            self.diagnostics = diagnostics.DiagnosticsWindow(diagnostics_report)
+        self.diagnostics.show()
+
+    def start_update_check(self):
+        # GitHub releases, checked in the background so a slow network never holds up the window
+        self.versions = update_checker.UpdateChecker(settings["repo"], __version__.strip("v"),
+                                                     cache_path=update_cache_path(),
+                                                     ttl=settings["update_check_hours"] * 60 * 60)
+
+        self.update_worker = update_checker.UpdateCheckWorker(self.versions, self)
+        self.update_worker.checked.connect(self.show_update_status)
+        self.update_worker.start()
+
+    def show_update_status(self):
+        newer = self.versions.newer_available
+        if newer is None:
+            self.update_status_widget.setText(strings.UPDATE_UNKNOWN.format(self.versions.latest))
+        else:
+            self.update_status_widget.setText(strings.UPDATE_AVAIL.format(self.versions.latest,
+                                                                          self.versions.current))
+        self.update_status_widget.setVisible(newer is not False)
+
+    def update_conns(self, connected: bool):
+        self.connection_status_widget.setVisible(not connected)
+
+    def update_health(self):
+        """ Frame hook """
+        if self.isMinimized():
+            return
+        self.health_strip.setHealth(health.snapshot(time.perf_counter()))
 
     def closeEvent(self, a0: QCloseEvent) -> None:
         close_all_windows()
+        store.flush()
         a0.accept()
 
 
@@ -403,20 +716,19 @@ class Settings(QMainWindow):
         self.conns_widget.setLayout(self.conns_layout)
         self.tabs.addTab(self.conns_widget, strings.TAB_SETUP_CONNS)
 
-        self.conns_warning = QLabel(strings.LABEL_CONNS_WARNING)
-        self.conns_layout.addWidget(self.conns_warning)
-
         self.ip_editor = widgets.QNamedLineEdit(strings.EDIT_SETUP_IP)
         self.ip_editor.lineedit.setPlaceholderText(strings.EDIT_SETUP_IP_PLHOLD)
         self.ip_editor.lineedit.setText(settings["ip"])
         self.ip_editor.lineedit.textChanged.connect(lambda: update_setting("ip", self.ip_editor.lineedit.text()))
+        self.ip_editor.lineedit.editingFinished.connect(lambda: change_robot_address(settings["ip"]))
         self.conns_layout.addWidget(self.ip_editor)
 
         self.cam_editor = widgets.QNamedLineEdit(strings.EDIT_SETUP_CAM)
         self.cam_editor.lineedit.setPlaceholderText(strings.EDIT_SETUP_CAM_PLHOLD)
-        self.cam_editor.lineedit.setText(settings["camera_http"])
-        self.cam_editor.lineedit.textChanged.connect(lambda: update_setting("camera_http",
-                                                                            self.cam_editor.lineedit.text()))
+        self.cam_editor.lineedit.setText(", ".join(settings["camera_http"]))
+        self.cam_editor.lineedit.textChanged.connect(
+            lambda: update_setting("camera_http", camera_urls(self.cam_editor.lineedit.text())))
+        self.cam_editor.lineedit.editingFinished.connect(lambda: change_camera_urls(settings["camera_http"]))
         self.conns_layout.addWidget(self.cam_editor)
 
         # Cam
@@ -448,43 +760,87 @@ class CamMonitor(QMainWindow):
         self.setWindowTitle(strings.CAM_TITLE)
         self.setWindowIcon(QIcon(os.path.join(os.path.dirname(os.path.realpath(__file__)), "res/icons/icon.svg")))
 
-        self.web = QWebEngineView()
-        self.web.setUrl(QUrl(settings["camera_http"]))
+        self.pool = camera.DecodePool(settings["camera_decode_workers"])
+        self.readers = []
+        self.cameras = camera.CameraLayout(settings["camera_layout"])
+        self.cameras.main_changed.connect(self.update_priorities)
+        self.stats = []
+        self.set_urls(settings["camera_http"])
+
+        # stalls are flagged even with the overlay off
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(camera.STATS_INTERVAL)
+        self.stats_timer.timeout.connect(self.update_overlay)
+        self.stats_timer.start()
+
+        self.preroll = None
+        self.clips = None
+        if settings["clip_buffer_mb"] > 0:
+            self.preroll = clips.FrameRing(int(settings["clip_buffer_mb"] * 2 ** 20))
+            self.clips = clips.ClipRecorder(self.preroll, clip_dir(), settings["clip_seconds"],
+                                            settings["clip_after_seconds"])
+        self.recording = None
 
         self.toolbar = QToolBar(strings.CAM_TOOLBAR)
         self.addToolBar(self.toolbar)
 
         self.refresh_button = QToolButton()
         self.refresh_button.setIconSize(QSize(72, 72))
-        self.refresh_button.setIcon(qtawesome.icon("mdi.refresh", color=os.environ["QTMATERIAL_PRIMARYCOLOR"]))
-        self.refresh_button.clicked.connect(self.web.reload)
+        self.refresh_button.clicked.connect(self.reload)
         self.toolbar.addWidget(self.refresh_button)
 
         self.zoom_in_button = QToolButton()
         self.zoom_in_button.setIconSize(QSize(72, 72))
-        self.zoom_in_button.setIcon(qtawesome.icon("mdi.magnify-plus", color=os.environ["QTMATERIAL_PRIMARYCOLOR"]))
-        self.zoom_in_button.clicked.connect(lambda: self.web.setZoomFactor(self.web.zoomFactor() + 0.2))
+        self.zoom_in_button.clicked.connect(lambda: self.zoom(0.2))
         self.toolbar.addWidget(self.zoom_in_button)
 
         self.zoom_out_button = QToolButton()
         self.zoom_out_button.setIconSize(QSize(72, 72))
-        self.zoom_out_button.setIcon(qtawesome.icon("mdi.magnify-minus", color=os.environ["QTMATERIAL_PRIMARYCOLOR"]))
-        self.zoom_out_button.clicked.connect(lambda: self.web.setZoomFactor(self.web.zoomFactor() - 0.2))
+        self.zoom_out_button.clicked.connect(lambda: self.zoom(-0.2))
         self.toolbar.addWidget(self.zoom_out_button)
 
         self.fullscreen_button = QToolButton()
         self.fullscreen_button.setIconSize(QSize(72, 72))
-        self.fullscreen_button.setIcon(qtawesome.icon("mdi.fullscreen", color=os.environ["QTMATERIAL_PRIMARYCOLOR"]))
         self.fullscreen_button.clicked.connect(self.toggle_fullscreen)
         self.toolbar.addWidget(self.fullscreen_button)
 
+        self.layout_button = QToolButton()
+        self.layout_button.setIconSize(QSize(72, 72))
+        self.layout_button.setToolTip(strings.CAM_LAYOUT)
+        self.layout_button.clicked.connect(self.toggle_layout)
+        self.toolbar.addWidget(self.layout_button)
+
+        self.overlay_button = QToolButton()
+        self.overlay_button.setIconSize(QSize(72, 72))
+        self.overlay_button.setToolTip(strings.CAM_OVERLAY)
+        self.overlay_button.setCheckable(True)
+        self.overlay_button.setChecked(settings["camera_overlay"])
+        self.overlay_button.toggled.connect(lambda checked: update_setting("camera_overlay", checked))
+        self.toolbar.addWidget(self.overlay_button)
+
+        self.clip_button = QToolButton()
+        self.clip_button.setIconSize(QSize(72, 72))
+        self.clip_button.setToolTip(strings.CAM_SAVE_CLIP)
+        self.clip_button.clicked.connect(lambda: self.save_clip(strings.CAM_CLIP_MANUAL))
+        self.clip_button.setVisible(self.clips is not None)
+        self.toolbar.addWidget(self.clip_button)
+
+        self.record_button = QToolButton()
+        self.record_button.setIconSize(QSize(72, 72))
+        self.record_button.setToolTip(strings.CAM_RECORD)
+        self.record_button.setCheckable(True)
+        self.record_button.toggled.connect(self.set_recording)
+        self.toolbar.addWidget(self.record_button)
+
         self.exit_button = QToolButton()
         self.exit_button.setIconSize(QSize(72, 72))
-        self.exit_button.setIcon(qtawesome.icon("mdi.close", color=os.environ["QTMATERIAL_PRIMARYCOLOR"]))
         self.exit_button.clicked.connect(close_all_windows)
         self.toolbar.addWidget(self.exit_button)
 
-        self.setCentralWidget(self.web)
+        self.update_icons()
+        self.set_recording(settings["camera_record"])
+
+        self.setCentralWidget(self.cameras)
 
         if not settings["camera_screen"] + 1 > len(QGuiApplication.screens()):
             monitor = QGuiApplication.screens()[settings["camera_screen"]].geometry()
@@ -505,6 +861,16 @@ class CamMonitor(QMainWindow):
         if platform.system() == "Windows":
             windll.LoadLibrary("dwmapi").DwmSetWindowAttribute(int(self.winId()), 20, byref(c_bool(dark)), sizeof(BOOL))
 
+    def update_icons(self):
+        """ Color the toolbar icons for the current theme """
+        color = os.environ["QTMATERIAL_PRIMARYCOLOR"]
+        for button, name in ((self.refresh_button, "mdi.refresh"), (self.zoom_in_button, "mdi.magnify-plus"),
+                             (self.zoom_out_button, "mdi.magnify-minus"), (self.fullscreen_button, "mdi.fullscreen"),
+                             (self.layout_button, "mdi.view-grid"), (self.overlay_button, "mdi.speedometer"),
+                             (self.clip_button, "mdi.content-save"), (self.record_button, "mdi.record-rec"),
+                             (self.exit_button, "mdi.close")):
+            button.setIcon(theme.icon(name, color, cache_dir()))
+
     def toggle_fullscreen(self):
         if self.isFullScreen():
             self.showNormal()
@@ -512,6 +878,122 @@ class CamMonitor(QMainWindow):
             self.showFullScreen()
         update_setting("cam_fullscreen", self.isFullScreen())
 
+    @property
+    def reader(self) -> camera.MJPEGReader:
+        """ The first camera's reader, the one clips and recordings are taken from """
+        return self.readers[0]
+
+    def set_urls(self, urls: list):
+        """ Show the streams at urls, streams at the same position switch URL instead of restarting """
+        urls = urls or [""]
+        for reader in self.readers[len(urls):]:
+            reader.stop()
+            self.pool.remove(reader)
+        readers = self.readers[:len(urls)]
+        for reader, url in zip(readers, urls):
+            reader.set_url(url)
+        for url in urls[len(readers):]:
+            reader = camera.MJPEGReader(url, self.pool)
+            self.pool.add(reader)
+            reader.start()
+            readers.append(reader)
+        self.readers = readers
+
+        views = self.cameras.views()[:len(readers)]
+        while len(views) < len(readers):
+            views.append(camera.MJPEGView())
+        for view, reader in zip(views, readers):
+            if view.reader() is not reader:
+                view.setReader(reader)
+        self.cameras.setViews(views)
+        self.stats = [camera.StreamStats(reader, view) for reader, view in zip(readers, views)]
+        self.update_priorities()
+
+    def update_priorities(self):
+        """ Full rate for the main view, the others are capped and decoded only when the main one is done """
+        main = self.cameras.mainIndex()
+        secondary_interval = 1 / settings["camera_secondary_fps"] if settings["camera_secondary_fps"] > 0 else 0.0
+        for number, reader in enumerate(self.readers):
+            if number == main:
+                self.pool.set_priority(reader, 0)
+            else:
+                self.pool.set_priority(reader, 1, secondary_interval)
+
+    def update_overlay(self):
+        now = time.perf_counter()
+        for stats in self.stats:
+            snapshot = stats.sample(now)
+            if snapshot.stalled is not None:
+                text, alert = strings.CAM_STALLED.format(snapshot.stalled), True
+            elif stats.reader.last_frame == 0.0:
+                text, alert = strings.CAM_NO_SIGNAL, True
+            else:
+                text, alert = None, False
+
+            if settings["camera_overlay"]:
+                overlay = strings.CAM_OVERLAY_STATS.format(
+                    snapshot.received_fps, snapshot.shown_fps,
+                    snapshot.age * 1000 if snapshot.age is not None else float("nan"),
+                    snapshot.bitrate / 1e6, snapshot.dropped, snapshot.dropped_rate)
+                text = overlay if text is None else f"{text}\n{overlay}"
+            stats.view.setOverlay(text, alert)
+
+    def zoom(self, step: float):
+        view = self.cameras.mainView()
+        view.setZoomFactor(view.zoomFactor() + step)
+
+    def toggle_layout(self):
+        self.cameras.setMode("grid" if self.cameras.mode() == "pip" else "pip")
+        update_setting("camera_layout", self.cameras.mode())
+
+    def reload(self):
+        for reader in self.readers:
+            reader.reconnect()
+
+    def save_clip(self, reason: str):
+        """ Save the buffered seconds of video around now, safe to call from any thread """
+        if self.clips is not None:
+            self.clips.trigger(reason)
+
+    def set_recording(self, enabled: bool):
+        """ Start or stop writing the stream to rolling segments, see clips.SegmentRecorder """
+        stopped = None
+        if enabled and self.recording is None:
+            directory = camera_record_dir()
+            try:
+                self.recording = clips.SegmentRecorder(directory, int(settings["camera_segment_mb"] * 2 ** 20),
+                                                       int(settings["camera_retention_mb"] * 2 ** 20))
+            except OSError as e:
+                logging.error(f"Camera recording disabled: {e}")
+            else:
+                logging.info(f"Recording camera to {directory}")
+        elif not enabled and self.recording is not None:
+            stopped, self.recording = self.recording, None
+
+        self.reader.sinks = tuple(sink for sink in (self.preroll, self.recording) if sink is not None)
+        if stopped is not None:
+            stopped.close()
+            logging.info(f"Recorded {stopped.frames} camera frames, {stopped.dropped} dropped")
+
+        recording = self.recording is not None
+        if self.record_button.isChecked() != recording:
+            self.record_button.setChecked(recording)
+        if settings["camera_record"] != recording:
+            update_setting("camera_record", recording)
+
+    def closeEvent(self, a0: QCloseEvent) -> None:
+        for reader in self.readers:
+            reader.stop()
+        self.pool.stop()
+        if self.clips is not None:
+            self.clips.close()
+        if self.recording is not None:
+            self.recording.close()
+        view = self.cameras.mainView()
+        logging.debug(f"Camera latency (receive -> paint): avg {view.latency * 1000:.1f} ms, "
+                      f"max {view.latency_max * 1000:.1f} ms")
+        a0.accept()
+
 
 class FirstRun(QMainWindow):
     def __init__(self):
@@ -567,48 +1049,56 @@ class FirstRun(QMainWindow):
 
 
 if __name__ == "__main__":
+    args = parser.parse_args()
+
     # settings
-    if os.path.exists(args.settings):
-        with open(args.settings, encoding="UTF-8") as f:
-            settings = json.load(f)
-    else:
-        settings = DEFAULT_SETTINGS
+    store = settings_store.SettingsStore(args.settings)
+    settings = store.load(DEFAULT_SETTINGS)
+    if migrate_settings(settings) or not os.path.exists(args.settings):
         save_settings()
 
     # logging
     logging.basicConfig(level=settings["log_level"])
     logging.debug(f"Loaded settings from {args.settings}")
+    health.heartbeat = settings["heartbeat_key"] or None
 
-    # NT
-    if not settings["first_run"]:
-        NetworkTables.initialize(server=settings["ip"])
-        sd = NetworkTables.getTable("SmartDashboard")
-        color = NetworkTables.getTable("RevColorSensor_V3")
-        sd.addEntryListener(value_changed)  # has to be done after setting up window
-        color.addEntryListener(color_value_changed)  # has to be done after setting up window
+    # Replay
+    replay_reader = None
+    if args.replay:
+        try:
+            replay_reader = telemetry.TelemetryReader(args.replay)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot replay {args.replay}: {e}")
 
     # Qt Application
-    app = QApplication(sys.argv)
-    app.setApplicationVersion(__version__)
-    app.setApplicationName(strings.APP_NAME)
-    app.setApplicationDisplayName(strings.APP_NAME)
+    with startup_profile.phase("application"):
+        app = QApplication(sys.argv)
+        app.setApplicationVersion(__version__)
+        app.setApplicationName(strings.APP_NAME)
+        app.setApplicationDisplayName(strings.APP_NAME)
 
     # Theme Setup
-    if settings["dark_mode"]:
-        qt_material.apply_stylesheet(app, theme="dark_red.xml", css_file="material-fixes.qss")
-    else:
-        qt_material.apply_stylesheet(app, theme="light_red.xml", css_file="material-fixes.qss")
+    with startup_profile.phase("theme"):
+        apply_theme(settings["dark_mode"])
+
+    ui_scheduler = scheduler.FrameScheduler(settings["ui_frame_rate"])
+    loop_lag = diagnostics.LoopLagProbe()
 
     # Windows
-    if settings["first_run"]:
+    if settings["first_run"] and replay_reader is None:
         settings["first_run"] = False
         save_settings()
 
-        cam = None
-        window = None
         fr = FirstRun()
     else:
-        cam = CamMonitor()
-        window = MainWindow()
-
-    sys.exit(app.exec())
+        # the main window is shown first, the camera, NetworkTables and the update check follow its first frame
+        with startup_profile.phase("main window"):
+            window = MainWindow()
+        startup.FirstFrameFilter(window, lambda: finish_startup(replay_reader))
+
+    exit_code = app.exec()
+    camera.wait_stopped()
+    if recorder is not None:
+        recorder.close()
+    store.close()
+    sys.exit(exit_code)
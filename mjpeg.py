@@ -0,0 +1,116 @@
+"""
+RobotGUI
+Streaming multipart/MJPEG parser
+"""
+
+SOI = b"\xff\xd8"
+EOI = b"\xff\xd9"
+
+DEFAULT_CAPACITY = 4 * 1024 * 1024
+
+
+class MJPEGParser:
+    """
+    Incremental MJPEG parser working in a single preallocated buffer
+
+    Data is read straight into the buffer with writable()/commit(), frames are
+    returned by next_frame() as memoryviews into the same buffer. A frame view
+    is only valid until the next call to writable() or feed().
+
+    Parts with a Content-Length header are cut by length, anything else is cut
+    at the JPEG end of image marker. Frames larger than the buffer are dropped.
+    """
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        self.capacity = capacity
+
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._start = 0  # first byte of the current part
+        self._end = 0  # end of valid data
+        self._scan = 0  # marker search resumes here
+        self._soi = -1  # start of the current JPEG, once found
+        self._length = None  # its Content-Length, if the part has one
+
+        self.frames = 0
+        self.overflows = 0
+        self.bytes_received = 0
+
+    def reset(self) -> None:
+        self._start = self._end = self._scan = 0
+        self._soi = -1
+        self._length = None
+
+    def writable(self) -> memoryview:
+        """ Free space at the end of the buffer, moving unparsed data to the front if needed """
+        if self._start == self._end:
+            self.reset()
+        elif self._end == self.capacity:
+            if self._start == 0:  # a single part does not fit
+                self.overflows += 1
+                self.reset()
+            else:
+                shift = self._start
+                self._buffer[:self._end - shift] = self._buffer[shift:self._end]
+                self._start, self._end, self._scan = 0, self._end - shift, self._scan - shift
+                if self._soi >= 0:
+                    self._soi -= shift
+        return self._view[self._end:]
+
+    def commit(self, count: int) -> None:
+        """ count bytes were written into the view returned by writable() """
+        self._end += count
+        self.bytes_received += count
+
+    def feed(self, data) -> None:
+        """ Copy data into the buffer, read frames in between feeds so it does not overflow """
+        data = memoryview(data)
+        while data:
+            space = self.writable()
+            count = min(len(space), len(data))
+            space[:count] = data[:count]
+            self.commit(count)
+            data = data[count:]
+
+    def next_frame(self):
+        """ Next complete JPEG as a memoryview, or None if more data is needed """
+        buffer = self._buffer
+
+        if self._soi < 0:
+            soi = buffer.find(SOI, self._scan, self._end)
+            if soi < 0:
+                # a trailing 0xff may be the first half of the marker
+                self._scan = max(self._scan, self._end - 1)
+                return None
+            self._soi = soi
+            self._length = self._content_length(self._start, soi)
+            self._scan = soi + 2
+
+        if self._length is not None:
+            end = self._soi + self._length
+            if end > self._end:
+                return None
+        else:
+            eoi = buffer.find(EOI, self._scan, self._end)
+            if eoi < 0:
+                self._scan = max(self._scan, self._end - 1)
+                return None
+            end = eoi + 2
+
+        frame = self._view[self._soi:end]
+        self._start = self._scan = end
+        self._soi = -1
+        self.frames += 1
+        return frame
+
+    def _content_length(self, start: int, stop: int):
+        """ Content-Length of the part headers in [start, stop), if any """
+        buffer = self._buffer
+        header = buffer.find(b"ength:", start, stop)  # Content-Length, content-length, ...
+        if header < 0:
+            return None
+        header += 6
+        line_end = buffer.find(b"\r\n", header, stop)
+        try:
+            return int(buffer[header:line_end if line_end >= 0 else stop])
+        except ValueError:
+            return None
@@ -0,0 +1,133 @@
+"""
+RobotGUI
+Local MJPEG stand-in server for testing the camera without the robot
+
+Run: python mjpeg_server.py [--size 1920x1080] [--fps 30] [--port 1181]
+The stream is served at http://127.0.0.1:<port>/stream.mjpg
+"""
+
+import argparse
+import glob
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BOUNDARY = b"frame"
+
+
+def synthetic_frames(width: int, height: int, count: int = 30, quality: int = 80) -> list:
+    """ JPEG encoded test frames with a moving bar """
+    from PyQt6.QtCore import QBuffer, QByteArray, QIODevice
+    from PyQt6.QtGui import QColor, QImage, QPainter
+
+    frames = []
+    for i in range(count):
+        image = QImage(width, height, QImage.Format.Format_RGB32)
+        image.fill(QColor("#263238"))
+        painter = QPainter(image)
+        bar = width // count
+        painter.fillRect(i * bar, 0, bar, height, QColor.fromHsv(i * 360 // count, 200, 230))
+        for y in range(0, height, 32):  # detail, so frames are not trivially compressible
+            painter.fillRect(0, y, width, 2, QColor.fromHsv((y + i * 12) % 360, 120, 160))
+        painter.end()
+
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        image.save(buffer, "JPG", quality)
+        frames.append(bytes(data))
+    return frames
+
+
+def file_frames(pattern: str) -> list:
+    frames = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, "rb") as file:
+            frames.append(file.read())
+    return frames
+
+
+class MJPEGServer(ThreadingHTTPServer):
+    """
+    Serves frames as multipart/x-mixed-replace at fps (0 = as fast as possible)
+    """
+    daemon_threads = True
+
+    def __init__(self, frames: list, fps: float = 30, port: int = 0, content_length: bool = True) -> None:
+        super(MJPEGServer, self).__init__(("127.0.0.1", port), _MJPEGHandler)
+
+        self.frames = frames
+        self.fps = fps
+        self.content_length = content_length
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/stream.mjpg"
+
+    def start(self) -> threading.Thread:
+        """ Serve on a background thread """
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class _MJPEGHandler(BaseHTTPRequestHandler):
+    server: MJPEGServer
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY.decode()}")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        parts = []
+        for frame in self.server.frames:
+            header = b"--" + BOUNDARY + b"\r\nContent-Type: image/jpeg\r\n"
+            if self.server.content_length:
+                header += b"Content-Length: %d\r\n" % len(frame)
+            parts.append(header + b"\r\n" + frame + b"\r\n")
+
+        period = 1 / self.server.fps if self.server.fps else 0
+        deadline = time.perf_counter()
+        index = 0
+        try:
+            while True:
+                self.wfile.write(parts[index])
+                index = (index + 1) % len(parts)
+                if period:
+                    deadline += period
+                    delay = deadline - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        deadline = time.perf_counter()
+        except (ConnectionError, OSError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local MJPEG stand-in server")
+    parser.add_argument("--port", type=int, default=1181)
+    parser.add_argument("--fps", type=float, default=30, help="frames per second, 0 = unthrottled")
+    parser.add_argument("--size", default="1280x720", help="synthetic frame size, WIDTHxHEIGHT")
+    parser.add_argument("--frames", help="glob of JPEG files to serve instead of synthetic frames")
+    parser.add_argument("--no-content-length", action="store_true",
+                        help="omit Content-Length so clients have to find the JPEG markers")
+    options = parser.parse_args()
+
+    if options.frames:
+        jpegs = file_frames(options.frames)
+    else:
+        width, height = (int(v) for v in options.size.lower().split("x"))
+        jpegs = synthetic_frames(width, height)
+
+    server = MJPEGServer(jpegs, options.fps, options.port, not options.no_content_length)
+    print(f"Serving {len(jpegs)} frames, avg {sum(map(len, jpegs)) // len(jpegs) // 1024} KiB, at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,123 @@
+"""
+RobotGUI
+Ring buffers and decimation for the time-series plots
+"""
+
+import math
+import threading
+
+import numpy as np
+
+from PyQt6.QtCore import QObject, QPointF, QTimer
+from PyQt6.QtGui import QPolygonF
+
+MAX_SAMPLE_RATE = 250  # Hz, the fastest a plotted value is expected to update, sizes the ring buffers
+
+
+def capacity_for(span: float) -> int:
+    """ Ring buffer size that holds span seconds of samples at MAX_SAMPLE_RATE """
+    return max(1, math.ceil(span * MAX_SAMPLE_RATE))
+
+
+class RingBuffer:
+    """
+    Preallocated ring of (time, value) samples, safe to append to from any thread
+    """
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+
+        self._lock = threading.Lock()
+        self._t = np.zeros(capacity)
+        self._y = np.zeros(capacity)
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, t: float, y: float) -> None:
+        with self._lock:
+            self._t[self._next] = t
+            self._y[self._next] = y
+            self._next = (self._next + 1) % self.capacity
+            if self._count < self.capacity:
+                self._count += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._next = self._count = 0
+
+    def since(self, t0: float) -> tuple[np.ndarray, np.ndarray]:
+        """ Samples with time >= t0, oldest first, only those are copied """
+        with self._lock:
+            if self._count < self.capacity:
+                halves = ((0, self._count),)
+            else:
+                halves = ((self._next, self.capacity), (0, self._next))  # older half first, each one sorted
+            t, y = [], []
+            for start, end in halves:
+                first = start + int(np.searchsorted(self._t[start:end], t0))
+                if first < end:
+                    t.append(self._t[first:end])
+                    y.append(self._y[first:end])
+            if not t:
+                return np.empty(0), np.empty(0)
+            return np.concatenate(t), np.concatenate(y)
+
+
+def decimate(t: np.ndarray, y: np.ndarray, t0: float, t1: float, columns: int):
+    """
+    Reduce samples in [t0, t1) to one (min, max) pair per pixel column
+
+    Returns (column indices, minimums, maximums) for the columns that have samples.
+    """
+    if not len(t) or columns <= 0:
+        empty = np.empty(0)
+        return empty.astype(np.intp), empty, empty
+
+    edges = np.linspace(t0, t1, columns + 1)
+    starts = np.searchsorted(t, edges[:-1])
+    ends = np.searchsorted(t, edges[1:])
+    used = np.nonzero(ends > starts)[0]
+    if not len(used):
+        empty = np.empty(0)
+        return used, empty, empty
+
+    # a column ends where the next non-empty one starts, so reduceat sees each column exactly once
+    values = y[:ends[used[-1]]]
+    indices = starts[used]
+    return used, np.minimum.reduceat(values, indices), np.maximum.reduceat(values, indices)
+
+
+def polygon(points: np.ndarray) -> QPolygonF:
+    """ QPolygonF from an (n, 2) float array without a Python loop over the points """
+    result = QPolygonF()
+    result.fill(QPointF(), len(points))
+    if len(points):
+        buffer = result.data()
+        buffer.setsize(len(points) * 2 * 8)
+        np.frombuffer(buffer, np.double).reshape(-1, 2)[:] = points
+    return result
+
+
+class PlotTicker(QObject):
+    """
+    One repaint tick shared by many plots, only plots with new data that are visible are repainted
+    """
+    def __init__(self, rate: int = 30, parent=None) -> None:
+        super(PlotTicker, self).__init__(parent)
+
+        self._plots = []
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(max(1, round(1000 / rate)))
+        self._timer.timeout.connect(self.tick)
+        self._timer.start()
+
+    def add(self, plot) -> None:
+        self._plots.append(plot)
+
+    def tick(self) -> None:
+        for plot in self._plots:
+            if plot.dirty and plot.isVisible():
+                plot.update()
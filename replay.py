@@ -0,0 +1,95 @@
+"""
+RobotGUI
+Telemetry replay
+"""
+
+import logging
+import time
+
+from PyQt6.QtCore import QObject, QTimer, Qt
+
+import telemetry
+
+MAX_SPEED_BATCH = 2000
+
+
+class TelemetryReplay(QObject):
+    """
+    Feeds a recorded telemetry log back into the NetworkTables callbacks
+
+    handlers maps a table name to a callback with the NetworkTables listener
+    signature, speed is a multiple of real time, 0 replays as fast as possible.
+    """
+    def __init__(self, reader: telemetry.TelemetryReader, handlers: dict, speed: float = 1.0,
+                 parent=None) -> None:
+        super(TelemetryReplay, self).__init__(parent)
+
+        self.reader = reader
+        self.handlers = handlers
+        self.speed = speed
+
+        self._records = None
+        self._next = None
+        self._log_origin = reader.start
+        self._wall_origin = 0.0
+
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.setInterval(5)
+        self._timer.timeout.connect(self._tick)
+
+    @property
+    def position(self) -> float:
+        """ Current log time, seconds since the start of the log """
+        if self.speed:
+            return self._log_origin - self.reader.start + (time.perf_counter() - self._wall_origin) * self.speed
+        return (self._next[0] if self._next else self.reader.end) - self.reader.start
+
+    def _emit(self, key: str, value) -> None:
+        table, _, name = key.partition("/")
+        handler = self.handlers.get(table)
+        if handler is not None:
+            handler(None, name, value, False)
+
+    def seek(self, position: float) -> None:
+        """ Jump to position seconds after the start of the log, applying the state at that time """
+        timestamp = self.reader.start + max(0.0, position)
+        state, offset = self.reader.seek(timestamp)
+        for key, value in state.items():
+            self._emit(key, value)
+
+        self._records = self.reader.records(offset)
+        self._next = next(self._records, None)
+        self._log_origin = timestamp
+        self._wall_origin = time.perf_counter()
+
+    def start(self, position: float = 0.0) -> None:
+        logging.info(f"Replaying {self.reader.path} ({self.reader.duration:.1f} s) from {position:.1f} s "
+                     f"at {f'{self.speed}x' if self.speed else 'max'} speed")
+        self.seek(position)
+        self._timer.start()
+
+    def stop(self) -> None:
+        self._timer.stop()
+
+    def _tick(self) -> None:
+        if self.speed:
+            until = self._log_origin + (time.perf_counter() - self._wall_origin) * self.speed
+            budget = None
+        else:
+            until = float("inf")
+            budget = MAX_SPEED_BATCH
+
+        record = self._next
+        while record is not None and record[0] <= until:
+            self._emit(record[1], record[2])
+            record = next(self._records, None)
+            if budget is not None:
+                budget -= 1
+                if not budget:
+                    break
+        self._next = record
+
+        if record is None:
+            logging.info(f"Replay of {self.reader.path} finished")
+            self._timer.stop()
@@ -0,0 +1,120 @@
+"""
+RobotGUI
+Frame-coalescing UI update scheduler
+"""
+
+import logging
+import threading
+
+from PyQt6.QtCore import QObject, QTimer, Qt
+
+
+class FrameScheduler(QObject):
+    """
+    Collects widget updates from any thread and applies them on the GUI thread once per frame
+
+    Updates are keyed by their setter, so a setter posted several times
+    within one frame is only called once, with the latest arguments.
+    """
+    def __init__(self, rate: int = 60, parent=None) -> None:
+        super(FrameScheduler, self).__init__(parent)
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._frame_hooks = []
+
+        self.received = 0
+        self.applied = 0
+        self.coalesced = 0
+
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.timeout.connect(self.flush)
+        self.set_rate(rate)
+        self._timer.start()
+
+    def set_rate(self, rate: int) -> None:
+        """ Frames per second """
+        self._timer.setInterval(max(1, round(1000 / max(1, rate))))
+
+    @property
+    def rate(self) -> float:
+        return 1000 / self._timer.interval()
+
+    def add_frame_hook(self, hook) -> None:
+        """ Call hook() on the GUI thread at the start of every frame, it may post updates for that frame """
+        self._frame_hooks.append(hook)
+
+    def post(self, func, *args) -> None:
+        """ Call func(*args) on the next frame, replacing any update for func still pending """
+        with self._lock:
+            self.received += 1
+            if func in self._pending:
+                self.coalesced += 1
+            self._pending[func] = args
+
+    def flush(self) -> None:
+        """ Apply every pending update """
+        for hook in self._frame_hooks:
+            hook()
+
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+
+        for func, args in pending.items():
+            try:
+                func(*args)
+            except Exception:  # one broken setter should not drop the whole frame
+                logging.exception("Widget update %r failed", func)
+        self.applied += len(pending)
+
+    def stats(self) -> dict:
+        return {"received": self.received, "applied": self.applied, "coalesced": self.coalesced}
+
+
+class PageGate:
+    """
+    Holds back widget updates for pages that are not on screen
+
+    While a page is hidden only the latest arguments per setter are kept, and
+    they are posted together when the page is shown again, so hidden widgets
+    cost nothing per update. Any thread may post, set_visible is called on the
+    GUI thread.
+    """
+    def __init__(self, post) -> None:
+        self._post = post
+
+        self._lock = threading.Lock()
+        self._visible = set()
+        self._held = {}
+
+        self.forwarded = 0
+        self.held = 0
+
+    def poster(self, page):
+        """ A post(func, *args) for the widgets on page """
+        def post(func, *args):
+            self.post(page, func, *args)
+        return post
+
+    def post(self, page, func, *args) -> None:
+        with self._lock:
+            if page in self._visible:
+                self.forwarded += 1
+                self._post(func, *args)
+            else:
+                self.held += 1
+                self._held.setdefault(page, {})[func] = args
+
+    def set_visible(self, pages) -> None:
+        """ The pages now on screen, held updates of newly shown pages are posted """
+        with self._lock:
+            self._visible = set(pages)
+            for page in self._visible:
+                for func, args in self._held.pop(page, {}).items():
+                    self._post(func, *args)
+
+    def stats(self) -> dict:
+        return {"forwarded": self.forwarded, "held": self.held}
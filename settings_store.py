@@ -0,0 +1,130 @@
+"""
+RobotGUI
+Debounced, atomic settings persistence
+"""
+
+import json
+import logging
+import os
+import stat
+import tempfile
+import threading
+import time
+
+SAVE_DELAY = 0.5  # seconds without changes before settings are written
+
+
+class SettingsStore:
+    """
+    Writes settings to a JSON file on a background thread
+
+    save() only takes a snapshot, the file is written once no save() has come
+    in for delay seconds, so typing into a settings field costs one write.
+    Files are replaced atomically (temporary file, fsync, os.replace), a crash
+    leaves either the old or the new settings, never half of them. The new
+    file keeps the old one's permissions, or gets the umask default if there
+    was none, rather than the owner-only mode of a temporary file.
+    """
+    def __init__(self, path: str, delay: float = SAVE_DELAY) -> None:
+        self.path = path
+        self.delay = delay
+
+        self._condition = threading.Condition()
+        self._pending = None
+        self._due = 0.0
+        self._writing = False
+        self._closed = False
+        self._thread = None
+
+        self.saves = 0
+        self.writes = 0
+
+        umask = os.umask(0)  # the only way to read the umask is to set it
+        os.umask(umask)
+        self._default_mode = 0o666 & ~umask
+
+    def load(self, defaults: dict) -> dict:
+        """ Settings from the file over defaults, a missing or unreadable file gives the defaults """
+        try:
+            with open(self.path, encoding="UTF-8") as file:
+                return {**defaults, **json.load(file)}
+        except FileNotFoundError:
+            return dict(defaults)
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to load settings from {self.path}, using defaults: {e}")
+            return dict(defaults)
+
+    def save(self, settings: dict) -> None:
+        """ Schedule a write of a snapshot of settings """
+        snapshot = dict(settings)
+        with self._condition:
+            self.saves += 1
+            self._pending = snapshot
+            self._due = time.monotonic() + self.delay
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="SettingsStore", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """ Write pending settings now, returns False if that took longer than timeout """
+        with self._condition:
+            if self._pending is None and not self._writing:
+                return True
+            self._due = 0.0
+            self._condition.notify_all()
+            return self._condition.wait_for(lambda: self._pending is None and not self._writing, timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._closed and (self._pending is None or time.monotonic() < self._due):
+                    self._condition.wait(None if self._pending is None else max(0.0, self._due - time.monotonic()))
+                if self._closed:
+                    return
+                settings, self._pending = self._pending, None
+                self._writing = True
+
+            try:
+                self._write(settings)
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
+
+    def _mode(self) -> int:
+        try:
+            return stat.S_IMODE(os.stat(self.path).st_mode)
+        except OSError:
+            return self._default_mode
+
+    def _write(self, settings: dict) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            descriptor, temporary = tempfile.mkstemp(prefix=os.path.basename(self.path) + ".", suffix=".tmp",
+                                                     dir=directory)
+        except OSError as e:
+            logging.error(f"Failed to save settings to {self.path}: {e}")
+            return
+
+        try:
+            with os.fdopen(descriptor, "w", encoding="UTF-8") as file:
+                json.dump(settings, file, indent=2)
+                file.flush()
+                os.fsync(file.fileno())
+            os.chmod(temporary, self._mode())
+            os.replace(temporary, self.path)
+        except OSError as e:
+            logging.error(f"Failed to save settings to {self.path}: {e}")
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            return
+        self.writes += 1
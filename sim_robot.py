@@ -0,0 +1,218 @@
+"""
+RobotGUI
+Simulated robot: a local NetworkTables server publishing the keys RobotGUI shows
+
+Run: python sim_robot.py [--scenario steady] [--rate 200] [--duration 0]
+ or: python sim_robot.py --script scenario.json
+
+A script is a JSON list of phases, run in order, for example
+    [
+        {"scenario": "steady", "duration": 10, "rate": 100},
+        {"scenario": "burst", "duration": 10, "rate": 100, "burst_rate": 5000},
+        {"scenario": "flap", "duration": 20, "rate": 100, "up": 5, "down": 2},
+        {"scenario": "flood", "duration": 10, "rate": 2000, "extra_keys": 5000}
+    ]
+
+Scenarios
+    steady  every robot key, rate updates per second in total
+    burst   steady, plus burst_length seconds at burst_rate every burst_every seconds
+    flap    steady, but the server goes down for `down` seconds after every `up` seconds
+    flood   steady, plus extra_keys unrelated SmartDashboard keys in the same rotation
+
+Every scenario also counts up SmartDashboard/Heartbeat, set "heartbeat_key" to it to test stale detection.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import math
+import os
+import tempfile
+import time
+
+from networktables import NetworkTablesInstance
+
+SD_TABLE = "SmartDashboard"
+COLOR_TABLE = "RevColorSensor_V3"
+
+MODES = ("Scoring", "Picking_up", "Idle")
+OBJECTS = ("Cube", "Cone", "Neither")
+SCORE_POSITIONS = ("high", "mid", "low", "Neither")
+PICK_POSITIONS = ("ground", "double_substation", "single_substation", "Neither")
+
+ENUM_PERIOD = 2.0  # seconds between changes of Mode, Object, ScorePos, PickPos
+HEARTBEAT_PERIOD = 0.1  # seconds between increments of the Heartbeat counter
+
+DEFAULT_PHASE = {
+    "scenario": "steady",
+    "duration": 0,  # 0 = forever
+    "rate": 200,
+    "burst_rate": 5000,
+    "burst_length": 0.5,
+    "burst_every": 3.0,
+    "up": 5.0,
+    "down": 2.0,
+    "extra_keys": 1000,
+}
+
+
+class SimulatedRobot:
+    """
+    A NetworkTables server publishing RobotGUI's keys with synthetic values
+    """
+    def __init__(self, address: str = "127.0.0.1", port: int = 1735) -> None:
+        self.address = address
+        self.port = port
+
+        self.nt = NetworkTablesInstance.create()
+        self._persist = os.path.join(tempfile.gettempdir(), f"robotgui-sim-{os.getpid()}.ini")
+        self.running = False
+
+        self.published = 0
+        self.reconnects = 0
+
+        self._origin = time.perf_counter()
+        self._enum_step = -1
+        self._heartbeat = -1
+        self._channels = self._robot_channels()
+        self._extra = []
+        self._rotation = itertools.cycle(self._channels)
+
+    def start(self) -> None:
+        self.nt.startServer(self._persist, self.address, self.port)
+        self.nt.setUpdateRate(0.01)
+        self.sd = self.nt.getTable(SD_TABLE)
+        self.color = self.nt.getTable(COLOR_TABLE)
+        self.running = True
+        self._publish_enums(time.perf_counter() - self._origin)
+        logging.info(f"NetworkTables server listening on {self.address}:{self.port}")
+
+    def stop(self) -> None:
+        if self.running:
+            self.nt.shutdown()
+            self.running = False
+
+    def set_extra_keys(self, count: int) -> None:
+        self._extra = [(SD_TABLE, f"Sim Extra {i}", lambda t, i=i: math.sin(t + i)) for i in range(count)]
+        self._rotation = itertools.cycle(self._channels + self._extra)
+
+    @staticmethod
+    def _robot_channels() -> list:
+        channels = []
+        for module in range(4):
+            offset = module * 45
+            channels.append((SD_TABLE, f"Mod {module} Cancoder", lambda t, o=offset: round((t * 90 + o) % 360, 3)))
+            channels.append((SD_TABLE, f"Mod {module} Integrated",
+                             lambda t, o=offset: round((t * 90 + o + 0.5 * math.sin(t)) % 360, 3)))
+            channels.append((SD_TABLE, f"Mod {module} Velocity", lambda t, o=offset: round(4 * math.sin(t + o), 3)))
+        channels.append((COLOR_TABLE, "colorSensorRed", lambda t: round(127 + 127 * math.sin(t), 1)))
+        channels.append((COLOR_TABLE, "colorSensorGreen", lambda t: round(127 + 127 * math.sin(t + 2.1), 1)))
+        channels.append((COLOR_TABLE, "colorSensorBlue", lambda t: round(127 + 127 * math.sin(t + 4.2), 1)))
+        channels.append((COLOR_TABLE, "colorSensorProx", lambda t: round(1024 + 1000 * math.sin(t / 3), 1)))
+        return channels
+
+    def _publish_enums(self, t: float) -> None:
+        step = self._enum_step = int(t / ENUM_PERIOD)
+        self.sd.putString("Mode", MODES[step % len(MODES)])
+        self.sd.putString("Object", OBJECTS[step % len(OBJECTS)])
+        self.sd.putString("ScorePos", SCORE_POSITIONS[step % len(SCORE_POSITIONS)])
+        self.sd.putString("PickPos", PICK_POSITIONS[step % len(PICK_POSITIONS)])
+        self.published += 4
+
+    def publish(self, count: int) -> None:
+        """ Publish the next count values of the rotation """
+        t = time.perf_counter() - self._origin
+        tables = {SD_TABLE: self.sd, COLOR_TABLE: self.color}
+        for _ in range(count):
+            table, key, value = next(self._rotation)
+            tables[table].putNumber(key, value(t))
+        self.published += count
+
+        if int(t / ENUM_PERIOD) != self._enum_step:
+            self._publish_enums(t)
+        if int(t / HEARTBEAT_PERIOD) != self._heartbeat:
+            self._heartbeat = int(t / HEARTBEAT_PERIOD)
+            self.sd.putNumber("Heartbeat", self._heartbeat)
+            self.published += 1
+        self.nt.flush()
+
+    def run_phase(self, phase: dict) -> None:
+        phase = {**DEFAULT_PHASE, **phase}
+        scenario = phase["scenario"]
+        if scenario not in ("steady", "burst", "flap", "flood"):
+            raise ValueError(f"Unknown scenario {scenario!r}")
+
+        logging.info(f"Phase: {phase}")
+        self.set_extra_keys(phase["extra_keys"] if scenario == "flood" else 0)
+        if not self.running:
+            self.start()
+
+        start = last = time.perf_counter()
+        owed = 0.0
+        while not phase["duration"] or last - start < phase["duration"]:
+            now = time.perf_counter()
+            elapsed = now - start
+            rate = phase["rate"]
+
+            if scenario == "burst" and elapsed % phase["burst_every"] < phase["burst_length"]:
+                rate = phase["burst_rate"]
+            elif scenario == "flap":
+                up = elapsed % (phase["up"] + phase["down"]) < phase["up"]
+                if up and not self.running:
+                    self.reconnects += 1
+                    self.start()
+                elif not up and self.running:
+                    logging.info("Server going down")
+                    self.stop()
+
+            owed += (now - last) * rate
+            last = now
+            if self.running and owed >= 1:
+                self.publish(int(owed))
+            owed -= int(owed)
+            time.sleep(0.001)
+
+
+def load_script(path: str) -> list:
+    with open(path, encoding="UTF-8") as file:
+        phases = json.load(file)
+    if isinstance(phases, dict):
+        phases = [phases]
+    return phases
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulated robot NetworkTables server")
+    parser.add_argument("--address", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1735)
+    parser.add_argument("--script", help="JSON list of phases to run")
+    parser.add_argument("--scenario", default="steady", choices=("steady", "burst", "flap", "flood"))
+    parser.add_argument("--rate", type=float, default=DEFAULT_PHASE["rate"], help="updates per second")
+    parser.add_argument("--duration", type=float, default=0, help="seconds, 0 = forever")
+    parser.add_argument("--extra-keys", type=int, default=DEFAULT_PHASE["extra_keys"], help="flood: unrelated keys")
+    parser.add_argument("--burst-rate", type=float, default=DEFAULT_PHASE["burst_rate"],
+                        help="burst: updates per second")
+    parser.add_argument("--loop", action="store_true", help="repeat the script forever")
+    options = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if options.script:
+        script = load_script(options.script)
+    else:
+        script = [{"scenario": options.scenario, "rate": options.rate, "duration": options.duration,
+                   "extra_keys": options.extra_keys, "burst_rate": options.burst_rate}]
+
+    robot = SimulatedRobot(options.address, options.port)
+    try:
+        while True:
+            for step in script:
+                robot.run_phase(step)
+            if not options.loop:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logging.info(f"Published {robot.published} values, {robot.reconnects} reconnects")
+        robot.stop()
@@ -0,0 +1,102 @@
+"""
+RobotGUI
+Startup profiling
+"""
+
+import builtins
+import contextlib
+import sys
+import time
+
+from PyQt6.QtCore import QEvent, QObject, QTimer
+
+COLD_START_BUDGET = 0.75  # seconds from the first import in main.py to the first frame of the main window
+
+
+class StartupProfile:
+    """
+    Times the imports and construction steps up to the first frame
+
+    Imports are timed by wrapping __import__ while tracking, only imports that
+    were not loaded yet count, and nested imports are included in the module
+    that triggered them.
+    """
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.imports = {}
+        self.phases = []
+        self.first_frame = None
+
+        self._import = None
+        self._depth = 0
+
+    def track_imports(self) -> None:
+        if self._import is not None:
+            return
+        original = self._import = builtins.__import__
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if self._depth or level or name in sys.modules:
+                return original(name, globals, locals, fromlist, level)
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                self._depth -= 1
+                self.imports[name] = self.imports.get(name, 0) + time.perf_counter() - start
+
+        builtins.__import__ = timed_import
+
+    def stop_imports(self) -> None:
+        if self._import is not None:
+            builtins.__import__ = self._import
+            self._import = None
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, start - self.start, time.perf_counter() - start))
+
+    def mark_first_frame(self) -> None:
+        if self.first_frame is None:
+            self.first_frame = time.perf_counter() - self.start
+
+    @property
+    def over_budget(self) -> bool:
+        return self.first_frame is not None and self.first_frame > COLD_START_BUDGET
+
+    def report(self) -> str:
+        lines = ["Imports:"]
+        for name, seconds in sorted(self.imports.items(), key=lambda item: item[1], reverse=True):
+            lines.append(f"  {seconds * 1000:8.1f} ms  {name}")
+        lines.append(f"  {sum(self.imports.values()) * 1000:8.1f} ms  total")
+
+        lines.append("Startup (start, duration):")
+        for name, start, seconds in self.phases:
+            lines.append(f"  {start * 1000:8.1f} ms {seconds * 1000:8.1f} ms  {name}")
+
+        if self.first_frame is not None:
+            lines.append(f"First frame after {self.first_frame * 1000:.1f} ms "
+                         f"(budget {COLD_START_BUDGET * 1000:.0f} ms{', OVER BUDGET' if self.over_budget else ''})")
+        return "\n".join(lines)
+
+
+class FirstFrameFilter(QObject):
+    """
+    Calls callback once, on the event loop iteration after widget is first painted
+    """
+    def __init__(self, widget, callback) -> None:
+        super(FirstFrameFilter, self).__init__(widget)
+
+        self._callback = callback
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event) -> bool:
+        if event.type() == QEvent.Type.Paint:
+            obj.removeEventFilter(self)
+            QTimer.singleShot(0, self._callback)
+        return False
@@ -0,0 +1,129 @@
+"""
+RobotGUI
+Central telemetry state
+"""
+
+import collections
+import threading
+
+from typing import Any, Optional
+
+PERIOD_DECAY = 0.05  # how fast a slot's period follows shorter gaps, per update
+
+
+class Slot:
+    """
+    The latest value of one telemetry key
+
+    version is the store's version at the slot's last update, so it only grows.
+    period is the time the key usually takes between updates: it follows a
+    longer gap at once and decays slowly towards shorter ones, so keys only
+    published on change get a long period rather than being counted late.
+    """
+    __slots__ = ("key", "index", "value", "version", "timestamp", "updates", "period")
+
+    def __init__(self, key: str, index: int) -> None:
+        self.key = key
+        self.index = index
+        self.value = None
+        self.version = 0
+        self.timestamp = 0.0
+        self.updates = 0
+        self.period = 0.0
+
+    def __repr__(self) -> str:
+        return f"Slot({self.key!r}, {self.value!r}, version={self.version})"
+
+
+class StateStore:
+    """
+    Latest value of every telemetry key ("Table/key"), updated from the listener threads
+
+    Every update bumps the global version and stamps it on the key's slot.
+    Slots are kept in the order of their last update, so changed_since(version)
+    walks only the slots that changed, and count_late() only the quiet ones,
+    instead of every key.
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._slots: dict[str, Slot] = {}
+        self._by_index: list[Slot] = []
+        self._order: collections.OrderedDict[str, Slot] = collections.OrderedDict()
+
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._by_index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._slots
+
+    def update(self, key: str, value: Any, timestamp: float) -> int:
+        """ Store value for key, returns the new version """
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = Slot(key, len(self._by_index))
+                self._by_index.append(slot)
+                self._order[key] = slot
+            else:
+                self._order.move_to_end(key)
+
+            if slot.updates:
+                gap = timestamp - slot.timestamp
+                slot.period = gap if gap > slot.period else slot.period + (gap - slot.period) * PERIOD_DECAY
+
+            self.version += 1
+            slot.value = value
+            slot.version = self.version
+            slot.timestamp = timestamp
+            slot.updates += 1
+            return self.version
+
+    def get(self, key: str, default: Any = None) -> Any:
+        slot = self._slots.get(key)
+        return default if slot is None else slot.value
+
+    def slot(self, key: str) -> Optional[Slot]:
+        return self._slots.get(key)
+
+    def slots(self) -> list[Slot]:
+        """ Every slot, by index (the order keys were first seen) """
+        with self._lock:
+            return list(self._by_index)
+
+    def snapshot(self) -> dict:
+        """ {key: value} of every key """
+        with self._lock:
+            return {slot.key: slot.value for slot in self._by_index}
+
+    def changed_since(self, version: int) -> tuple[int, dict]:
+        """
+        (current version, {key: value} of the keys updated after version)
+
+        Pass the returned version to the next call to get only newer changes.
+        """
+        with self._lock:
+            changed = {}
+            for slot in reversed(self._order.values()):
+                if slot.version <= version:
+                    break
+                changed[slot.key] = slot.value
+            return self.version, changed
+
+    def count_late(self, now: float, minimum: float, factor: float, min_updates: int) -> int:
+        """
+        Number of keys overdue by more than factor times their period, and at least minimum seconds
+
+        Keys with fewer than min_updates updates have no period yet and never
+        count. Walks only the keys not updated in the last minimum seconds.
+        """
+        with self._lock:
+            count = 0
+            for slot in self._order.values():
+                age = now - slot.timestamp
+                if age <= minimum:
+                    break
+                if slot.updates >= min_updates and age > factor * slot.period:
+                    count += 1
+            return count
@@ -12,11 +12,23 @@ ROBOT_NAME_EE = bytes.fromhex("f09f908820456c204761746f204c6f636f20f09f9088").de
 
 CONN_NOT_CONNECTED = "{0} does not have an active NetworkTables server."
 UPDATE_AVAIL = "Application update available v{1} -> v{0}"
+UPDATE_UNKNOWN = "Update status unknown, latest release is {0}"
+
+HEALTH_WAITING = "Waiting for NetworkTables"
+HEALTH_CONNECTED = "Connected {0:.0f} s"
+HEALTH_DISCONNECTED = "Disconnected {0:.0f} s"
+HEALTH_AGE = "Last update {0:.0f} ms ago"
+HEALTH_NO_DATA = "No data"
+HEALTH_GAP = "Gap avg {0:.1f} ms, max {1:.0f} ms"
+HEALTH_LATE = "Late keys {0}/{1}"
+HEALTH_RECONNECTS = "Reconnects {0}"
+HEALTH_RECONNECTS_OUTAGE = "Reconnects {0}, last outage {1:.1f} s"
 
 MENU_FILE = "File"
 MENU_HELP = "Help"
 MENU_ABOUT = "About"
 MENU_ABOUT_QT = "About Qt"
+MENU_DIAGNOSTICS = "Diagnostics"
 MENU_SETUP = "Settings"
 MENU_QUIT = "Quit"
 
@@ -32,6 +44,13 @@ LABEL_VELOCITY_TITLE = "Velocity"
 
 SWERVE_MOD = "Swerve Mod {0}"
 
+PLOT_ANGLE = "Angle"
+PLOT_VELOCITY = "Velocity"
+PLOT_COLOR = "Color"
+PLOT_PROX = "Proximity"
+
+COLOR_STATS = "Sensor: {0:.1f} samples/s, jitter {1:.1f} ms"
+
 # Settings
 SETUP_WINDOW_TITLE = "Settings"
 
@@ -39,7 +58,6 @@ TAB_SETUP_THEME = "Theme"
 TAB_SETUP_CONNS = "Network"
 TAB_SETUP_CAM = "Cam Screen"
 
-LABEL_CONNS_WARNING = "Restart the application for these settings to apply"
 LABEL_CAM_WARNING = "Restart the application for these settings to apply"
 
 CHECK_DARK_MODE = "Dark Mode"
@@ -47,15 +65,37 @@ CHECK_DARK_MODE = "Dark Mode"
 EDIT_SETUP_IP = "IP Address"
 EDIT_SETUP_IP_PLHOLD = "10.XX.XX.X"
 
-EDIT_SETUP_CAM = "Camera Address"
-EDIT_SETUP_CAM_PLHOLD = "Camera HTTP Link"
+EDIT_SETUP_CAM = "Camera Addresses"
+EDIT_SETUP_CAM_PLHOLD = "Camera HTTP Links, separated by commas"
 
 SPIN_CAM_SCREEN = "Default Camera Display"
 
+# Diagnostics
+DIAG_TITLE = "Diagnostics"
+DIAG_EXPORT = "Export"
+DIAG_KEY = "Key"
+DIAG_UPDATES = "Updates"
+DIAG_RATE = "Rate (Hz)"
+DIAG_VALUE = "Value"
+DIAG_LAG = "Event loop lag     p50 {0:7.2f} ms  p99 {1:7.2f} ms  max {2:7.2f} ms"
+DIAG_HANDLER = "{0:<19}{1:>9} calls  p50 {2:6.0f} us  p99 {3:6.0f} us  max {4:8.0f} us"
+DIAG_UPDATES_SUMMARY = "Widget updates     {0} queued, {1} applied, {2} coalesced, {3} held for hidden tabs"
+DIAG_RSS = "Memory (RSS)       {0:.1f} MiB"
+
 # Cams
 CAM_TITLE = "Camera Stream"
 
-CAM_TOOLBAR = "Camera Browser Toolbar"
+CAM_TOOLBAR = "Camera Toolbar"
+CAM_SAVE_CLIP = "Save the last seconds of video"
+CAM_CLIP_MANUAL = "manual"
+CAM_RECORD = "Record the camera stream"
+CAM_LAYOUT = "Switch between grid and picture in picture"
+CAM_OVERLAY = "Show stream statistics"
+CAM_OVERLAY_STATS = ("Received {:5.1f} fps  Shown {:5.1f} fps\n"
+                     "Frame age {:5.0f} ms  {:5.1f} Mbit/s\n"
+                     "Dropped {} ({:.1f}/s)")
+CAM_STALLED = "STALLED {:.1f} s"
+CAM_NO_SIGNAL = "NO SIGNAL"
 
 # First Run
 FIRST_RUN_WINDOW_TITLE = "First Run"
@@ -0,0 +1,351 @@
+"""
+RobotGUI
+Binary telemetry recorder
+
+File layout: an 8 byte magic + version header, then a stream of 20 byte
+records. Keys and string values are interned: the first time one is seen a
+definition record is written, followed by its UTF-8 text, and later records
+refer to it by id.
+
+    record: kind u8, type u8, key id u16, timestamp f64, payload 8 bytes
+
+Every few seconds a snapshot of the latest value of every key is written, so
+a reader can seek without replaying everything before it. String ids are
+forgotten at each snapshot, so reading can start at any snapshot. On close a
+footer with the snapshot index and the key table is appended:
+
+    index:   INDEX record (payload: count), count x (timestamp f64, offset u64)
+    keys:    KEYS record (payload: count), count x (length u16, text)
+    trailer: footer offset u64, END_MAGIC
+"""
+
+import bisect
+import glob
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+MAGIC: bytes = b"RGTL\x02\x00\x00\x00"
+END_MAGIC: bytes = b"RGTLEND\x00"
+
+KIND_VALUE = 1
+KIND_KEY = 2  # payload: text length, followed by the key text
+KIND_STRING = 3  # payload: string id, text length, followed by the text
+KIND_SNAPSHOT = 4  # payload: number of STATE records in the snapshot
+KIND_STATE = 5  # like VALUE, but part of a snapshot
+KIND_INDEX = 6
+KIND_KEYS = 7
+
+TYPE_FLOAT = 0
+TYPE_BOOL = 1
+TYPE_STRING = 2  # payload is a string id
+TYPE_OTHER = 3  # repr() of anything else (arrays, raw), as a string id
+
+RECORD_SIZE = 20
+_FLOAT = struct.Struct("<BBHdd")
+_INT = struct.Struct("<BBHdQ")
+_STRING_DEF = struct.Struct("<BBHdII")
+_HEADER = struct.Struct("<BBHd")
+_INDEX_ENTRY = struct.Struct("<dQ")
+_KEY_LENGTH = struct.Struct("<H")
+_TRAILER = struct.Struct("<Q8s")
+
+MAX_INTERNED_STRINGS = 4096
+
+LOG_PATTERN = "telemetry-*.rgtl"
+RETENTION_BYTES = 1024 * 2 ** 20
+
+
+def enforce_retention(directory: str, retention_bytes: int = RETENTION_BYTES) -> None:
+    """ Delete the oldest logs in directory while all of them together exceed retention_bytes """
+    logs = []
+    for path in sorted(glob.glob(os.path.join(directory, LOG_PATTERN))):
+        try:
+            logs.append((path, os.path.getsize(path)))
+        except OSError:
+            pass
+
+    total = sum(size for _, size in logs)
+    for path, size in logs:
+        if total <= retention_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.error(f"Failed to delete old telemetry log {path}: {e}")
+            continue
+        total -= size
+        logging.debug(f"Deleted old telemetry log {path}")
+
+
+class TelemetryRecorder:
+    """
+    Appends (timestamp, key, value) records to a binary log
+
+    record() only packs the record and queues it, a background thread does
+    the file I/O in large batches, one every flush_interval, and writes the
+    snapshots.
+    """
+    def __init__(self, path: str, flush_interval: float = 0.5, snapshot_interval: float = 5.0,
+                 buffer_size: int = 1024 * 1024) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self.snapshot_interval = snapshot_interval
+
+        self._file = open(path, "wb", buffering=buffer_size)
+        self._file.write(MAGIC)
+
+        self._keys: dict[str, int] = {}
+        self._strings: dict[str, int] = {}
+        self._next_string = 0
+
+        self._state: dict[int, object] = {}
+        self._index: list[tuple[float, int]] = []
+        self._first = None
+        self._last = 0.0
+        self._next_snapshot = 0.0
+
+        self._lock = threading.Lock()
+        self._pending = []
+        self._stop = threading.Event()
+
+        self.records = 0
+        self.bytes_written = len(MAGIC)
+
+        self._writer = threading.Thread(target=self._write_loop, name="TelemetryWriter", daemon=True)
+        self._writer.start()
+
+    def record(self, key: str, value, timestamp: float = None) -> None:
+        """ Queue a value, safe to call from any thread """
+        if timestamp is None:
+            timestamp = time.time()
+
+        with self._lock:
+            key_id = self._keys.get(key)
+            if key_id is None:
+                key_id = self._define_key(key)
+                if self._first is None:
+                    self._first = timestamp
+
+            self._pending.append(self._pack(KIND_VALUE, key_id, timestamp, value))
+            self._state[key_id] = value
+            self._last = timestamp
+            self.records += 1
+
+    def _pack(self, kind: int, key_id: int, timestamp: float, value) -> bytes:
+        cls = value.__class__
+        if cls is float or cls is int:
+            return _FLOAT.pack(kind, TYPE_FLOAT, key_id, timestamp, value)
+        elif cls is bool:
+            return _INT.pack(kind, TYPE_BOOL, key_id, timestamp, value)
+        elif cls is str:
+            return _INT.pack(kind, TYPE_STRING, key_id, timestamp, self._intern(value, timestamp))
+        return _INT.pack(kind, TYPE_OTHER, key_id, timestamp, self._intern(repr(value), timestamp))
+
+    def _define_key(self, key: str) -> int:
+        key_id = len(self._keys)
+        if key_id > 0xffff:
+            raise OverflowError("Too many telemetry keys")
+        self._keys[key] = key_id
+
+        text = key.encode("utf-8")
+        self._pending.append(_INT.pack(KIND_KEY, 0, key_id, 0.0, len(text)) + text)
+        return key_id
+
+    def _intern(self, value: str, timestamp: float) -> int:
+        string_id = self._strings.get(value)
+        if string_id is None:
+            if len(self._strings) >= MAX_INTERNED_STRINGS:
+                # ever-changing strings, stop remembering old ones so memory stays bounded
+                self._strings.clear()
+            string_id = self._next_string
+            self._next_string += 1
+            self._strings[value] = string_id
+
+            text = value.encode("utf-8")
+            self._pending.append(_STRING_DEF.pack(KIND_STRING, 0, 0, timestamp, string_id, len(text)) + text)
+        return string_id
+
+    def _snapshot(self) -> None:
+        """ Queue the latest value of every key, lock must be held """
+        timestamp = self._last
+        self._index.append((timestamp, self.bytes_written + sum(map(len, self._pending))))
+        self._strings.clear()  # later records must not refer to strings defined before the snapshot
+
+        self._pending.append(_INT.pack(KIND_SNAPSHOT, 0, 0, timestamp, len(self._state)))
+        for key_id, value in self._state.items():
+            self._pending.append(self._pack(KIND_STATE, key_id, timestamp, value))
+        self._next_snapshot = timestamp + self.snapshot_interval
+
+    def _write_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self._write_pending()
+        self._write_pending()
+
+    def _write_pending(self) -> None:
+        with self._lock:
+            if self._state and self._last >= self._next_snapshot:
+                self._snapshot()
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+
+        data = b"".join(pending)
+        try:
+            self._file.write(data)
+            self._file.flush()  # so a crash loses at most flush_interval, the reader can scan what is on disk
+        except OSError as e:
+            logging.error(f"Failed to write telemetry to {self.path}: {e}")
+            return
+        self.bytes_written += len(data)
+
+    def _footer(self) -> bytes:
+        footer = [_INT.pack(KIND_INDEX, 0, 0, self._last, len(self._index))]
+        footer += [_INDEX_ENTRY.pack(timestamp, offset) for timestamp, offset in self._index]
+        footer.append(_INT.pack(KIND_KEYS, 0, 0, self._first or 0.0, len(self._keys)))
+        for key in self._keys:
+            text = key.encode("utf-8")
+            footer.append(_KEY_LENGTH.pack(len(text)) + text)
+        footer.append(_TRAILER.pack(self.bytes_written, END_MAGIC))
+        return b"".join(footer)
+
+    def close(self) -> None:
+        self._stop.set()
+        self._writer.join()
+        try:
+            self._file.write(self._footer())
+        except OSError as e:
+            logging.error(f"Failed to write telemetry index to {self.path}: {e}")
+        self._file.close()
+
+
+class TelemetryReader:
+    """
+    Reads a log written by TelemetryRecorder
+
+    Logs without a footer (the recorder did not close cleanly) are indexed by
+    scanning the whole file once.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+        with open(path, "rb") as file:
+            self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a RobotGUI telemetry log")
+
+        self.keys: list[str] = []
+        self.index: list[tuple[float, int]] = []
+        self.start = 0.0
+        self.end = 0.0
+        self._strings: dict[int, str] = {}
+
+        if not self._read_footer():
+            self._scan()
+
+    def close(self) -> None:
+        self._data.close()
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    def _read_footer(self) -> bool:
+        data = self._data
+        if len(data) < len(MAGIC) + _TRAILER.size:
+            return False
+        footer, end_magic = _TRAILER.unpack_from(data, len(data) - _TRAILER.size)
+        if end_magic != END_MAGIC:
+            return False
+        self._end_offset = footer
+
+        _, _, _, self.end, count = _INT.unpack_from(data, footer)
+        offset = footer + RECORD_SIZE
+        for _ in range(count):
+            self.index.append(_INDEX_ENTRY.unpack_from(data, offset))
+            offset += _INDEX_ENTRY.size
+
+        _, _, _, self.start, count = _INT.unpack_from(data, offset)
+        offset += RECORD_SIZE
+        for _ in range(count):
+            length, = _KEY_LENGTH.unpack_from(data, offset)
+            offset += _KEY_LENGTH.size
+            self.keys.append(bytes(data[offset:offset + length]).decode("utf-8"))
+            offset += length
+        return True
+
+    def _scan(self) -> None:
+        logging.info(f"{self.path} has no index, scanning it")
+        data = self._data
+        offset = len(MAGIC)
+        first = None
+        while offset + RECORD_SIZE <= len(data):
+            kind, _, _, timestamp, payload = _INT.unpack_from(data, offset)
+            if kind == KIND_KEY:
+                self.keys.append(bytes(data[offset + RECORD_SIZE:offset + RECORD_SIZE + payload]).decode("utf-8"))
+                offset += payload
+            elif kind == KIND_STRING:
+                offset += payload >> 32
+            elif kind == KIND_SNAPSHOT:
+                self.index.append((timestamp, offset))
+            elif kind == KIND_VALUE:
+                if first is None:
+                    first = timestamp
+                self.end = timestamp
+            elif kind != KIND_STATE:  # footer of a damaged file, or garbage
+                break
+            offset += RECORD_SIZE
+        self._end_offset = min(offset, len(data))
+        self.start = first or 0.0
+
+    def _read(self, offset: int, kinds=(KIND_VALUE,)):
+        """ Yields (offset, kind, timestamp, key, value) of the records starting at offset """
+        data = self._data
+        end = self._end_offset
+        strings = self._strings
+        while offset + RECORD_SIZE <= end:
+            kind, value_type, key_id, timestamp = _HEADER.unpack_from(data, offset)
+            if kind == KIND_STRING:
+                string_id, length = struct.unpack_from("<II", data, offset + 12)
+                start = offset + RECORD_SIZE
+                strings[string_id] = bytes(data[start:start + length]).decode("utf-8")
+                offset = start + length
+                continue
+            if kind == KIND_KEY:
+                offset += RECORD_SIZE + _INT.unpack_from(data, offset)[4]
+                continue
+            if kind in kinds:
+                if value_type == TYPE_FLOAT:
+                    value = _FLOAT.unpack_from(data, offset)[4]
+                elif value_type == TYPE_BOOL:
+                    value = bool(_INT.unpack_from(data, offset)[4])
+                else:
+                    value = strings.get(_INT.unpack_from(data, offset)[4])
+                yield offset, kind, timestamp, self.keys[key_id], value
+            elif kind not in (KIND_VALUE, KIND_STATE, KIND_SNAPSHOT):
+                return
+            offset += RECORD_SIZE
+
+    def seek(self, timestamp: float) -> tuple[dict, int]:
+        """
+        State of every key at timestamp, and the offset to continue reading from
+        """
+        position = bisect.bisect_right(self.index, (timestamp, float("inf"))) - 1
+        offset = self.index[position][1] if position >= 0 else len(MAGIC)
+
+        state = {}
+        for offset, kind, record_time, key, value in self._read(offset, (KIND_VALUE, KIND_STATE)):
+            if kind == KIND_VALUE and record_time > timestamp:
+                return state, offset
+            state[key] = value
+        return state, self._end_offset
+
+    def records(self, offset: int = len(MAGIC)):
+        """ Yields (timestamp, key, value) from offset on """
+        for _, _, timestamp, key, value in self._read(offset):
+            yield timestamp, key, value
@@ -0,0 +1,140 @@
+"""
+RobotGUI
+Cached qt_material themes and toolbar icons
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+
+from PyQt6.QtCore import QDir, QSize
+from PyQt6.QtGui import QColor, QFontDatabase, QGuiApplication, QIcon, QPalette, QPixmap
+
+ICON_SIZE = 72
+
+_fonts_added = False
+
+
+class ThemeCache:
+    """
+    Applies qt_material themes from stylesheets rendered once and kept in cache_dir
+
+    A cached theme stores the full stylesheet (css_file merged in), the
+    QTMATERIAL_* environment and the generated icon folder, so applying it
+    needs neither qt_material nor jinja. Entries are keyed by the qt_material
+    version and a hash of css_file, and re-rendered when either changes.
+    """
+    def __init__(self, cache_dir: str, css_file: str) -> None:
+        self.cache_dir = cache_dir
+        self.css_file = css_file
+        self._key = None
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def key(self) -> str:
+        if self._key is None:
+            import importlib.metadata
+
+            try:
+                version = importlib.metadata.version("qt-material")
+            except importlib.metadata.PackageNotFoundError:
+                version = "unknown"
+            with open(self.css_file, "rb") as file:
+                digest = hashlib.sha1(file.read()).hexdigest()[:16]
+            self._key = f"{version}-{digest}"
+        return self._key
+
+    def _path(self, theme: str) -> str:
+        return os.path.join(self.cache_dir, f"{os.path.splitext(theme)[0]}.json")
+
+    def _load(self, theme: str):
+        try:
+            with open(self._path(theme), encoding="UTF-8") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if entry.get("key") != self.key or not os.path.isdir(entry.get("icons", "")):
+            return None
+        return entry
+
+    def _render(self, theme: str) -> dict:
+        import qt_material
+
+        # a folder per theme, so the icons of both themes stay on disk
+        stylesheet = qt_material.build_stylesheet(theme, parent=f"robotgui_{os.path.splitext(theme)[0]}")
+        with open(self.css_file, encoding="UTF-8") as file:
+            stylesheet += file.read().format(**os.environ)
+
+        entry = {
+            "key": self.key,
+            "stylesheet": stylesheet,
+            "environ": {name: value for name, value in os.environ.items() if name.startswith("QTMATERIAL_")},
+            "icons": QDir.searchPaths("icon")[-1],
+            "fonts": os.path.join(os.path.dirname(qt_material.__file__), "fonts", "roboto"),
+        }
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self._path(theme), "w", encoding="UTF-8") as file:
+                json.dump(entry, file)
+        except OSError as e:
+            logging.warning(f"Failed to cache theme {theme}: {e}")
+        return entry
+
+    def apply(self, app, theme: str) -> None:
+        """ Apply a qt_material theme such as "dark_red.xml" to app """
+        entry = self._load(theme)
+        if entry is None:
+            self.misses += 1
+            entry = self._render(theme)
+        else:
+            self.hits += 1
+
+        _add_fonts(entry["fonts"])
+        os.environ.update(entry["environ"])
+        QDir.setSearchPaths("icon", [entry["icons"]])
+
+        # what qt_material does to the palette under PyQt6
+        primary = entry["environ"]["QTMATERIAL_PRIMARYCOLOR"]
+        palette = QGuiApplication.palette()
+        palette.setColor(QPalette.ColorRole.Text, QColor(*(int(primary[i:i + 2], 16) for i in (1, 3, 5)), 92))
+        QGuiApplication.setPalette(palette)
+
+        app.setStyleSheet(entry["stylesheet"])
+
+
+def _add_fonts(directory: str) -> None:
+    global _fonts_added
+    if _fonts_added or not os.path.isdir(directory):
+        return
+    for font in os.listdir(directory):
+        if font.endswith(".ttf"):
+            QFontDatabase.addApplicationFont(os.path.join(directory, font))
+    _fonts_added = True
+
+
+@functools.lru_cache(maxsize=None)
+def icon(name: str, color: str, cache_dir: str, size: int = ICON_SIZE) -> QIcon:
+    """
+    A qtawesome icon rasterized once per color
+
+    The pixmap is also kept in cache_dir, so later runs do not import qtawesome at all.
+    """
+    path = os.path.join(cache_dir, "icons", f"{name}-{color.lstrip('#')}-{size}.png")
+    pixmap = QPixmap(path)
+    if pixmap.isNull():
+        import qtawesome  # ~220 ms
+
+        pixmap = qtawesome.icon(name, color=color).pixmap(QSize(size, size))
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            saved = pixmap.save(path, "PNG")
+        except OSError:
+            saved = False
+        if not saved:
+            logging.warning(f"Failed to cache icon {name} in {path}")
+    return QIcon(pixmap)
@@ -3,20 +3,151 @@ RobotGUI
 GitHub Update Checker
 """
 
-import semantic_version
-import requests
+import json
+import logging
+import threading
+import time
+
+from typing import Optional
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+
+TIMEOUT = 3.0  # seconds, for connecting and for each read
+HARD_TIMEOUT = 10.0  # seconds, after this the check counts as failed and a later result is ignored
+DEFAULT_TTL = 6 * 60 * 60
 
 
 class UpdateChecker:
-    def __init__(self, github: str, current: str) -> None:
+    """
+    Looks up the latest GitHub release
+
+    The result is cached in cache_path for ttl seconds, after that the cached
+    result is revalidated with its ETag, so an unchanged release costs a 304.
+    """
+    def __init__(self, github: str, current: str, cache_path: str = None, ttl: float = DEFAULT_TTL) -> None:
         self.github = github
         self.current = current
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.latest = "0.0.0"
+
+    def _load_cache(self) -> dict:
+        if not self.cache_path:
+            return {}
+        try:
+            with open(self.cache_path, encoding="UTF-8") as file:
+                cache = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if cache.get("repo") != self.github:
+            return {}
+        return cache
+
+    def _save_cache(self, cache: dict) -> None:
+        if not self.cache_path:
+            return
+        try:
+            with open(self.cache_path, "w", encoding="UTF-8") as file:
+                json.dump(cache, file, indent=2)
+        except OSError as e:
+            logging.warning(f"Failed to cache update check: {e}")
+
+    def cached(self) -> str:
+        """ The latest release from the cache however old it is, "0.0.0" without one """
+        return self._load_cache().get("latest") or "0.0.0"
+
+    def check(self) -> str:
+        """ Blocking, run this off the GUI thread """
+        self.latest = self.lookup()
+        return self.latest
+
+    def lookup(self) -> str:
+        """ Like check, but only returns the latest release, safe to abandon on another thread """
+        import requests  # ~90 ms, imported on the checking thread
+
+        cache = self._load_cache()
+        if cache.get("latest") and time.time() - cache.get("checked", 0) < self.ttl:
+            return cache["latest"]
+
+        headers = {"Accept": "application/vnd.github+json"}
+        if cache.get("etag"):
+            headers["If-None-Match"] = cache["etag"]
+
         try:
             # Github API
-            self.latest = requests.get(f"https://api.github.com/repos/{github}/releases/latest").json()["name"]
-        except (requests.RequestException, KeyError):
-            self.latest = "0.0.0"
+            response = requests.get(f"https://api.github.com/repos/{self.github}/releases/latest",
+                                    headers=headers, timeout=(TIMEOUT, TIMEOUT))
+            if response.status_code == 304 and cache.get("latest"):
+                latest = cache["latest"]
+            else:
+                response.raise_for_status()
+                release = response.json()
+                latest = str(release.get("name") or release["tag_name"])  # name is null when the release has none
+                cache["etag"] = response.headers.get("ETag", "")
+        except (requests.RequestException, KeyError, ValueError) as e:
+            logging.info(f"Update check failed: {e}")
+            return cache.get("latest") or "0.0.0"
+
+        cache.update({"repo": self.github, "latest": latest, "checked": time.time()})
+        self._save_cache(cache)
+        return latest
 
     @property
-    def newer_available(self) -> bool:
-        return semantic_version.compare(self.latest, self.current) == 1 | 0
+    def newer_available(self) -> Optional[bool]:
+        """ None if either version is not a version number, release names are free text """
+        import semantic_version
+
+        try:
+            latest = semantic_version.Version.coerce(str(self.latest).lstrip("v"))
+            current = semantic_version.Version.coerce(str(self.current).lstrip("v"))
+        except ValueError:
+            logging.warning(f"Cannot compare release {self.latest!r} to version {self.current!r}")
+            return None
+        return latest > current
+
+
+class UpdateCheckWorker(QObject):
+    """
+    Runs UpdateChecker.lookup on a daemon thread, checked is emitted on the GUI thread when it is done
+
+    The check is capped at timeout seconds by a timer on the GUI thread, as
+    neither requests nor the DNS lookup it does can be given a total limit.
+    When it fires the cached result, if any, is used and the thread's result
+    is ignored whenever it arrives.
+    """
+    checked = pyqtSignal()
+    _looked_up = pyqtSignal(str)
+
+    def __init__(self, checker: UpdateChecker, parent=None, timeout: float = HARD_TIMEOUT) -> None:
+        super(UpdateCheckWorker, self).__init__(parent)
+
+        self.checker = checker
+        self.done = False
+        self.timed_out = False
+
+        self._looked_up.connect(self._finish)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(int(timeout * 1000))
+        self._timer.timeout.connect(self._timeout)
+
+    def start(self) -> None:
+        self._timer.start()
+        threading.Thread(target=self._run, name="UpdateCheck", daemon=True).start()
+
+    def _run(self) -> None:
+        self._looked_up.emit(self.checker.lookup())
+
+    def _timeout(self) -> None:
+        logging.info("Update check timed out")
+        self.timed_out = True
+        self._finish(self.checker.cached())
+
+    @pyqtSlot(str)
+    def _finish(self, latest: str) -> None:
+        if self.done:
+            return
+        self.done = True
+        self._timer.stop()
+        self.checker.latest = latest
+        self.checked.emit()
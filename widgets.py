@@ -3,21 +3,71 @@
 from PyQt6.QtWidgets import (QFrame, QHBoxLayout, QVBoxLayout,
                              QLineEdit, QLabel, QWidget, QSpinBox, QPushButton)
 from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QColor, QPainter, QPen
 
 import enum
+import functools
+import time
 
+from typing import Optional
+
+import numpy as np
+
+import plotting
 import strings
 
 
 def rgb_to_hex(rgb):
     return '%02x%02x%02x' % rgb
 
+
+@functools.lru_cache(maxsize=64)
+def _named_color(color: str) -> QColor:
+    return QColor(color)
+
+
 class Serverity(enum.Enum):
     SEVERE = 0
     WARN = 1
 
 
-class ColorBlock(QFrame):
+SEVERITY_COLORS = {
+    Serverity.SEVERE: QColor("#ef5350"),
+    Serverity.WARN: QColor("#ffc107"),
+}
+
+
+class PaintedFrame(QFrame):
+    """
+    A QFrame with a solid background painted in paintEvent
+
+    Changing the color only schedules a repaint, unlike a stylesheet change
+    which makes Qt parse and re-polish the widget.
+    """
+    def __init__(self) -> None:
+        super(PaintedFrame, self).__init__()
+
+        self._background = QColor()
+
+    def background(self) -> QColor:
+        return QColor(self._background)
+
+    def setBackground(self, color: QColor) -> None:
+        if color.rgba() == self._background.rgba() and color.isValid() == self._background.isValid():
+            return
+        self._background = QColor(color)
+        self.update()
+
+    def paintEvent(self, event) -> None:
+        super(PaintedFrame, self).paintEvent(event)
+
+        if self._background.isValid():
+            painter = QPainter(self)
+            painter.fillRect(self.contentsRect(), self._background)
+            painter.end()
+
+
+class ColorBlock(PaintedFrame):
     """
     A simple widget ot show a single color
     """
@@ -33,14 +83,15 @@ class ColorBlock(QFrame):
         """
         Sets the color of the widget
         """
-        self.setStyleSheet(f"background-color: {color};")
+        self.setBackground(_named_color(color))
 
     def setRGB(self, red, green, blue):
         """
-        Sets the color of the widget in (r, g, b)
+        Sets the color of the widget in (r, g, b), values are clamped to 0-255
         """
-        color_str = rgb_to_hex((int(red), int(green), int(blue)))
-        self.setStyleSheet(f"background-color: #{color_str};")
+        self.setBackground(QColor(min(max(int(red), 0), 255),
+                                  min(max(int(green), 0), 255),
+                                  min(max(int(blue), 0), 255)))
 
 
 class QNamedLineEdit(QWidget):
@@ -77,17 +128,14 @@ class QNamedSpinBox(QWidget):
         self.__layout.addWidget(self.spin)
 
 
-class StatusBar(QFrame):
+class StatusBar(PaintedFrame):
     def __init__(self, text="", closeable=False, severity=Serverity.SEVERE) -> None:
         super(StatusBar, self).__init__()
 
         self.closeable = closeable
 
         self.setFrameShape(QFrame.Shape.Box)
-        if severity == Serverity.SEVERE:
-            self.setStyleSheet("background-color: #ef5350;")
-        elif severity == Serverity.WARN:
-            self.setStyleSheet("background-color: #ffc107;")
+        self.setSeverity(severity)
         self.setMinimumHeight(48)
 
         self.__layout = QHBoxLayout()
@@ -98,13 +146,134 @@ class StatusBar(QFrame):
         self.__text.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.__layout.addWidget(self.__text)
 
+    def setSeverity(self, severity: Serverity) -> None:
+        self.setBackground(SEVERITY_COLORS[severity])
+
+    def setText(self, text: str) -> None:
+        self.__text.setText(text)
+
     def mousePressEvent(self, QMouseEvent):
         if self.closeable:
             self.setVisible(False)
 
 
+class HealthStrip(PaintedFrame):
+    """
+    One line of NetworkTables link statistics, red while the data is stale (see link_health.LinkHealth)
+    """
+    def __init__(self) -> None:
+        super(HealthStrip, self).__init__()
+
+        self.setMaximumHeight(32)
+
+        self.__layout = QHBoxLayout()
+        self.__layout.setContentsMargins(6, 0, 6, 0)
+        self.setLayout(self.__layout)
+
+        self.__link = QLabel(strings.HEALTH_WAITING)
+        self.__age = QLabel(strings.HEALTH_NO_DATA)
+        self.__gap = QLabel()
+        self.__late = QLabel()
+        self.__reconnects = QLabel()
+        for label in (self.__link, self.__age, self.__gap, self.__late, self.__reconnects):
+            self.__layout.addWidget(label)
+
+    def setHealth(self, health) -> None:
+        """ Show a link_health.HealthSnapshot """
+        self.setBackground(SEVERITY_COLORS[Serverity.SEVERE] if health.stale else QColor())
+
+        if health.since is None:
+            self.__link.setText(strings.HEALTH_WAITING)
+        elif health.connected:
+            self.__link.setText(strings.HEALTH_CONNECTED.format(health.since))
+        else:
+            self.__link.setText(strings.HEALTH_DISCONNECTED.format(health.since))
+
+        if health.age is None:
+            self.__age.setText(strings.HEALTH_NO_DATA)
+        else:
+            self.__age.setText(strings.HEALTH_AGE.format(health.age * 1000))
+
+        self.__gap.setText(strings.HEALTH_GAP.format(health.gap_avg * 1000, health.gap_max * 1000))
+        self.__late.setText(strings.HEALTH_LATE.format(health.late_keys, health.keys))
+
+        if health.last_outage is None:
+            self.__reconnects.setText(strings.HEALTH_RECONNECTS.format(health.reconnects))
+        else:
+            self.__reconnects.setText(strings.HEALTH_RECONNECTS_OUTAGE.format(health.reconnects, health.last_outage))
+
+
+class TimeSeriesPlot(QWidget):
+    """
+    Rolling plot of the last span seconds of one or more series
+
+    Samples go into preallocated ring buffers and can be appended from any
+    thread, they hold span seconds at up to plotting.MAX_SAMPLE_RATE unless a
+    capacity is given. Drawing reduces each series to one min/max pair per
+    pixel column, so the paint cost depends on the widget width, not on the
+    sample rate.
+    """
+    def __init__(self, title: str, series: list, span: float = 60.0, capacity: Optional[int] = None) -> None:
+        super(TimeSeriesPlot, self).__init__()
+
+        self.title = title
+        self.span = span
+        self.dirty = False
+
+        self.names = [name for name, _ in series]
+        self.pens = [QPen(QColor(color)) for _, color in series]
+        capacity = capacity or plotting.capacity_for(span)
+        self.buffers = [plotting.RingBuffer(capacity) for _ in series]
+
+        self.setMinimumHeight(72)
+
+    def append(self, series: int, value) -> None:
+        try:
+            self.buffers[series].append(time.monotonic(), float(value))
+        except (TypeError, ValueError):
+            return
+        self.dirty = True
+
+    def paintEvent(self, _) -> None:
+        self.dirty = False
+        painter = QPainter(self)
+        width, height = self.width(), self.height()
+
+        now = time.monotonic()
+        t0 = now - self.span
+        lines = []
+        low, high = np.inf, -np.inf
+        for buffer in self.buffers:
+            t, y = buffer.since(t0)
+            columns, minimums, maximums = plotting.decimate(t, y, t0, now, width)
+            lines.append((columns, minimums, maximums))
+            if len(columns):
+                low, high = min(low, minimums.min()), max(high, maximums.max())
+
+        painter.setPen(self.palette().text().color())
+        painter.drawText(4, 14, self.title)
+        if low > high:
+            return
+        if low == high:
+            low, high = low - 1, high + 1
+        painter.drawText(width - 84, 14, f"{high:10.2f}")
+        painter.drawText(width - 84, height - 4, f"{low:10.2f}")
+
+        top, bottom = 20, height - 8
+        scale = (bottom - top) / (high - low)
+        for (columns, minimums, maximums), pen in zip(lines, self.pens):
+            if not len(columns):
+                continue
+            points = np.empty((len(columns) * 2, 2))
+            points[:, 0] = np.repeat(columns, 2)
+            points[0::2, 1] = bottom - (minimums - low) * scale
+            points[1::2, 1] = bottom - (maximums - low) * scale
+            painter.setPen(pen)
+            painter.drawPolyline(plotting.polygon(points))
+
+
 class Swerve(QWidget):
-    def __init__(self, title: str = "Swerve") -> None:
+    def __init__(self, title: str = "Swerve", plot_span: float = 60.0) -> None:
         super(Swerve, self).__init__()
 
         self.__layout = QVBoxLayout()
@@ -159,6 +328,17 @@ class Swerve(QWidget):
         self.velocity_value = QLabel(strings.UNKNOWN)
         self.__frame_layout.addWidget(self.velocity_value)
 
+        self.angle_plot = TimeSeriesPlot(strings.PLOT_ANGLE, [(strings.LABEL_CANCODER_TITLE, "#f44336"),
+                                                              (strings.LABEL_INTEGRATED_TITLE, "#2196f3")],
+                                         plot_span)
+        self.__frame_layout.addWidget(self.angle_plot)
+
+        self.velocity_plot = TimeSeriesPlot(strings.PLOT_VELOCITY, [(strings.LABEL_VELOCITY_TITLE, "#4caf50")],
+                                            plot_span)
+        self.__frame_layout.addWidget(self.velocity_plot)
+
+        self.plots = [self.angle_plot, self.velocity_plot]
+
     def setCancoderValue(self, value: float) -> None:
         self.cancoder_value.setText(str(value))
 
@@ -168,6 +348,16 @@ class Swerve(QWidget):
     def setVelocityValue(self, value: float) -> None:
         self.velocity_value.setText(str(value))
 
+    def sampleCancoder(self, value: float) -> None:
+        """ Add a sample to the plots, safe to call from any thread """
+        self.angle_plot.append(0, value)
+
+    def sampleIntegrated(self, value: float) -> None:
+        self.angle_plot.append(1, value)
+
+    def sampleVelocity(self, value: float) -> None:
+        self.velocity_plot.append(0, value)
+
 
 class HLine(QFrame):
     def __init__(self) -> None: